@@ -12,11 +12,8 @@ from hlt import constants
 # This library contains direction metadata to better interface with the game.
 from hlt.positionals import Direction
 
-# Import position class for navigation
-from hlt.positionals import Position
-
-# This library allows you to generate random numbers.
-import random
+# NumPy lets you work with the map's halite grid as a whole.
+import numpy as np
 
 # Logging allows you to save messages for yourself. This is required because the regular STDOUT
 #   (print statements) are reserved for the engine-bot communication.
@@ -28,6 +25,8 @@ import logging
 game = Game()
 # At this point "game" variable is populated with initial map data.
 # This is a good place to do computationally expensive start-up pre-processing.
+# Build the ring and diamond index tables used to scan for halite around ships.
+game.game_map.get_diamond_indices(game.me.shipyard.position, 9)
 # As soon as you call "ready" function below, the 2 second per turn timer will start.
 game.ready("LikeABotOutOfHalite")
 
@@ -39,14 +38,7 @@ logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
 
 
 def get_total_halite(game_map):
-    game_height = game_map.height
-    game_width = game_map.width
-    total_halite = 0
-    for x_pos in range(game_width):
-        for y_pos in range(game_height):
-            position = Position(x_pos, y_pos)
-            total_halite += game_map[(position)].halite_amount
-    return total_halite
+    return int(game_map.halite_grid.sum())
 
 
 def assign_ship_status(ship):
@@ -54,7 +46,7 @@ def assign_ship_status(ship):
     if ship.id not in ship_status.keys():
         ship_status[ship.id] = 'leaving_shipyard'
     if ship_status[ship.id] == 'returning':
-        if current_ship_position == me.shipyard.position:
+        if game_map.get_nearest_structure(me, current_ship_position)[1] == 0:
             ship_status[ship.id] = 'leaving_shipyard'
     elif game_map[current_ship_position].halite_amount > HALITE_HARVESTING_THRESHOLD and not ship.is_full:
         ship_status[ship.id] = 'harvest'
@@ -70,101 +62,55 @@ def assign_ship_status(ship):
 def handle_ships_staying_to_harvest(ship):
     if ship_status[ship.id] == 'harvest':
         fleet_move_chart[ship.id] = Direction.Still
-        fleet_positions_next_turn.append(ship.position.directional_offset(Direction.Still))
-
-
-def safe_navigate(ship, destination):
-    directions = [Direction.North, Direction.South, Direction.East, Direction.West, Direction.Still]
-    min_distance = 1000
-    best_direction = Direction.Still
-    for direction in directions:
-        test_location = ship.position.directional_offset(direction)
-        distance = game_map.calculate_distance(test_location, destination)
-        if distance < min_distance and test_location not in fleet_positions_next_turn:
-            if test_location == me.shipyard.position and game_map[test_location].is_occupied:
-                pass
-            else:
-                min_distance = distance
-                best_direction = direction
-    return best_direction
-
-
-def rollup_navigate(ship, destination):
-    directions = [Direction.North, Direction.South, Direction.East, Direction.West, Direction.Still]
-    min_distance = 1000
-    best_direction = Direction.Still
-    for direction in directions:
-        test_location = ship.position.directional_offset(direction)
-        distance = game_map.calculate_distance(test_location, destination)
-        if distance < min_distance and test_location not in fleet_positions_next_turn:
-            min_distance = distance
-            best_direction = direction
-    return best_direction
-
-
-def get_test_position_offsets_from_proximity(proximity):
-    position_offsets = []
-    if proximity == 1:
-        position_offsets.append(Position(0,0))
-    for i in range(-proximity, proximity+1):
-        position_offsets.append(Position(i, proximity))
-        position_offsets.append(Position(i, -proximity))
-        position_offsets.append(Position(proximity, i))
-        position_offsets.append(Position(-proximity, i))
-    return position_offsets
+        fleet_positions_next_turn.add(ship.position)
 
 
 def find_nearby_position_highest_reward(ship):
     origin = ship.position
+    halite = game_map.halite_grid.ravel()
     max_reward_found = -1
     best_position = origin
     for proximity in range(1, 10):
-        positions = get_test_position_offsets_from_proximity(proximity)
-        for position in positions:
-            test_location = origin + position
-            reward_at_test_direction = game_map[test_location].halite_amount
-            if reward_at_test_direction > max_reward_found \
-                    and test_location not in fleet_positions_next_turn \
-                    and test_location != me.shipyard.position:
+        if proximity == 1:
+            candidates = game_map.get_diamond_indices(origin, proximity)
+        else:
+            candidates = game_map.get_ring_indices(origin, proximity)
+        for index in candidates[np.argsort(-halite[candidates], kind='stable')]:
+            if halite[index] <= max_reward_found:
+                break
+            test_location = game_map.index_to_position(index)
+            if test_location not in fleet_positions_next_turn and test_location != me.shipyard.position:
                 best_position = test_location
-                max_reward_found = reward_at_test_direction
+                max_reward_found = halite[index]
+                break
         if game_map[best_position].halite_amount > HALITE_HARVESTING_THRESHOLD:
             return best_position
     return best_position
 
 
-def get_direction_leaving_shipyard(ship):
-    directions = [Direction.North, Direction.South, Direction.East, Direction.West]
-    while len(directions) > 0:
-        test_direction = random.choice(directions)
-        test_position = ship.position.directional_offset(test_direction)
-        if test_position in fleet_positions_next_turn:
-            directions.remove(test_direction)
-        else:
-            return test_direction
-    return Direction.Still
-
-
-def get_direction_to_move(ship):
-    if ship_status[ship.id] != 'harvest':
-        if ship_status[ship.id] == 'leaving_shipyard':
-            go_direction = get_direction_leaving_shipyard(ship)
-            ship_status[ship.id] = 'explore'
-
-        if ship_status[ship.id] == 'explore':
-            go_direction = safe_navigate(ship, ship_destination[ship.id])
-
-        elif ship_status[ship.id] == 'returning':
-            go_direction = safe_navigate(ship, me.shipyard.position)
+def get_ship_destination(ship):
+    if ship_status[ship.id] == 'leaving_shipyard':
+        ship_status[ship.id] = 'explore'
+    if ship_status[ship.id] == 'explore':
+        return ship_destination[ship.id]
+    if ship_status[ship.id] == 'returning':
+        # Head for the next cell on the path home that burns the least halite
+        structure = game_map.get_cheapest_structure(me, ship.position)
+        return game_map.directional_offset(ship.position, game_map.get_cheapest_direction(structure, ship.position))
+    return me.shipyard.position
 
-        elif ship_status[ship.id] == 'rollup':
-            go_direction = rollup_navigate(ship, me.shipyard.position)
 
-        fleet_move_chart[ship.id] = go_direction
-        go_position = ship.position.directional_offset(go_direction)
-        if not (ship.position.directional_offset(go_direction) == me.shipyard.position
-                and ship_status[ship.id] == 'rollup'):
-            fleet_positions_next_turn.append(go_position)
+def move_fleet(ships):
+    # Harvesting ships stay out of the assignment: they keep their cells, which stay marked unsafe for the others
+    ships = [ship for ship in ships if ship_status[ship.id] != 'harvest']
+    destinations = {ship: get_ship_destination(ship) for ship in ships}
+    rolling_up = any(ship_status[ship.id] == 'rollup' for ship in ships)
+    stacking_positions = [me.shipyard.position] if rolling_up else []
+    fleet_move_chart.update(game_map.navigate_fleet(destinations, stacking_positions=stacking_positions))
+    for ship in ships:
+        go_position = game_map.directional_offset(ship.position, fleet_move_chart[ship.id])
+        if not (go_position == me.shipyard.position and ship_status[ship.id] == 'rollup'):
+            fleet_positions_next_turn.add(go_position)
 
 
 map_starting_halite_total = get_total_halite(game.game_map)
@@ -185,18 +131,20 @@ while True:
     me = game.me
     game_map = game.game_map
 
+    # If this turn runs out of time, have every ship stay still rather than time out
+    game.set_fallback_commands([ship.stay_still() for ship in me.get_ships()])
+
     # A command queue holds all the commands you will run this turn. You build this list up and submit it at the
     #   end of the turn.
     command_queue = []
     fleet_move_chart = {}
-    fleet_positions_next_turn = []
+    fleet_positions_next_turn = set()
 
     for ship in me.get_ships():
         assign_ship_status(ship)
         handle_ships_staying_to_harvest(ship)
 
-    for ship in me.get_ships():
-        get_direction_to_move(ship)
+    move_fleet(me.get_ships())
 
     for ship in me.get_ships():
         command_queue.append(ship.move(fleet_move_chart[ship.id]))
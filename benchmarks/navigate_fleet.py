@@ -0,0 +1,97 @@
+"""
+Compares GameMap.navigate_fleet with calling naive_navigate for one ship at a time. The fleet is packed into a
+16x16 corner of a 32x32 map among a few enemy ships, and every ship heads for a random destination. Progress is
+the total reduction in distance to destination, and unaffordable counts ships ordered to move without the
+halite to pay for it, which the engine leaves where they are.
+
+    python benchmarks/navigate_fleet.py --ships 20 60 100 150 200 --seeds 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from engine_stream import CONSTANTS  # noqa: E402
+from hlt import constants  # noqa: E402
+from hlt.entity import Ship  # noqa: E402
+from hlt.game_map import GameMap  # noqa: E402
+from hlt.positionals import Position  # noqa: E402
+
+MAP_SIZE = 32
+CORNER_SIZE = 16
+NUM_ENEMIES = 10
+
+
+def make_fleet(num_ships, seed):
+    """
+    :return: A map with the fleet and enemy ships on it, and a dict of each ship of the fleet to its destination
+    """
+    rng = random.Random(seed)
+    game_map = GameMap(np.array([[rng.randint(0, 1000) for _ in range(MAP_SIZE)] for _ in range(MAP_SIZE)],
+                                dtype=np.int32))
+    cells = rng.sample([Position(x, y) for x in range(CORNER_SIZE) for y in range(CORNER_SIZE)],
+                       num_ships + NUM_ENEMIES)
+    ships = [Ship(0, ship_id, position, rng.randint(0, 1000)) for ship_id, position in enumerate(cells[:num_ships])]
+    enemies = [Ship(1, num_ships + ship_id, position, 0) for ship_id, position in enumerate(cells[num_ships:])]
+    for ship in ships + enemies:
+        game_map[ship.position].mark_unsafe(ship)
+    return game_map, {ship: Position(rng.randrange(MAP_SIZE), rng.randrange(MAP_SIZE)) for ship in ships}
+
+
+def run(navigate, num_ships, seed):
+    """
+    :param navigate: Called with a map and the destinations, returning a dict of ship id to direction
+    :return: The milliseconds navigate took, the progress made and the number of unaffordable moves
+    """
+    game_map, destinations = make_fleet(num_ships, seed)
+    started = time.perf_counter()
+    moves = navigate(game_map, destinations)
+    duration = (time.perf_counter() - started) * 1e3
+    progress = 0
+    unaffordable = 0
+    for ship, destination in destinations.items():
+        target = game_map.directional_offset(ship.position, moves[ship.id])
+        progress += (game_map.calculate_distance(ship.position, destination)
+                     - game_map.calculate_distance(target, destination))
+        if target != ship.position and \
+                ship.halite_amount < game_map[ship.position].halite_amount // constants.MOVE_COST_RATIO:
+            unaffordable += 1
+    return duration, progress, unaffordable
+
+
+def navigate_sequentially(game_map, destinations):
+    return {ship.id: game_map.naive_navigate(ship, destination) for ship, destination in destinations.items()}
+
+
+def navigate_fleet(game_map, destinations):
+    return game_map.navigate_fleet(destinations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ships', type=int, nargs='+', default=[20, 60, 100, 150, 200])
+    parser.add_argument('--seeds', type=int, default=5)
+    args = parser.parse_args()
+    constants.load_constants(CONSTANTS)
+
+    print('{:>6}  {:<40}  {:<40}'.format('ships', 'navigate_fleet', 'sequential naive_navigate'))
+    for num_ships in args.ships:
+        columns = []
+        for navigate in (navigate_fleet, navigate_sequentially):
+            results = [run(navigate, num_ships, seed) for seed in range(args.seeds)]
+            durations, progress, unaffordable = zip(*results)
+            columns.append('{:6.2f} ms, progress {:5.1f}, unaffordable {:4.1f}'.format(
+                statistics.median(durations), statistics.mean(progress), statistics.mean(unaffordable)))
+        print('{:>6}  {:<40}  {:<40}'.format(num_ships, *columns))
+
+
+if __name__ == '__main__':
+    main()
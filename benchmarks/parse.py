@@ -0,0 +1,61 @@
+"""
+Times Game.update_frame on a synthetic game, see tests/engine_stream.py. To compare against another version of the
+starter kit, e.g. the per-line input() parser that FrameReader replaced, point --sdk at a checkout of it:
+
+    git worktree add /tmp/per-line <commit before FrameReader>
+    python benchmarks/parse.py
+    python benchmarks/parse.py --sdk /tmp/per-line
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_turns(data):
+    """
+    :param data: The engine input
+    :return: The seconds update_frame took for every turn
+    """
+    import hlt
+
+    sys.stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(data)))
+    game = hlt.Game()
+    durations = []
+    for _ in range(hlt.constants.MAX_TURNS):
+        started = time.perf_counter()
+        game.update_frame()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sdk', default=ROOT,
+                        help='The directory holding the hlt package to time, by default this checkout')
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--players', type=int, default=4, choices=(2, 4))
+    parser.add_argument('--turns', type=int, default=400)
+    parser.add_argument('--last', type=int, default=100, help='Only report the last this many turns')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, 'tests'))
+    from engine_stream import generate
+    data = generate(args.size, args.turns, args.players)
+
+    sys.path.insert(0, os.path.abspath(args.sdk))
+    # The Game logs to bot-<id>.log in the working directory
+    os.chdir(tempfile.mkdtemp())
+    durations = [duration * 1e3 for duration in time_turns(data)[-args.last:]]
+    print('{}: {}x{}, {} players, last {} turns: mean {:.3f} ms, median {:.3f} ms, max {:.3f} ms per turn'.format(
+        args.sdk, args.size, args.size, args.players, len(durations), statistics.mean(durations),
+        statistics.median(durations), max(durations)))
+
+
+if __name__ == '__main__':
+    main()
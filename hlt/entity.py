@@ -1,29 +1,20 @@
 import abc
 
 from . import commands, constants
-from .positionals import Direction, Position
-from .common import read_input
+from .positionals import Direction
 
 
 class Entity(abc.ABC):
     """
     Base Entity Class from whence Ships, Dropoffs and Shipyards inherit
     """
+    __slots__ = ('owner', 'id', 'position')
+
     def __init__(self, owner, id, position):
         self.owner = owner
         self.id = id
         self.position = position
 
-    @staticmethod
-    def _generate(player_id):
-        """
-        Method which creates an entity for a specific player given input from the engine.
-        :param player_id: The player id for the player who owns this entity
-        :return: An instance of Entity along with its id
-        """
-        ship_id, x_position, y_position = map(int, read_input().split())
-        return ship_id, Entity(player_id, ship_id, Position(x_position, y_position))
-
     def __repr__(self):
         return "{}(id={}, {})".format(self.__class__.__name__,
                                       self.id,
@@ -34,13 +25,15 @@ class Dropoff(Entity):
     """
     Dropoff class for housing dropoffs
     """
-    pass
+    __slots__ = ()
 
 
 class Shipyard(Entity):
     """
     Shipyard class to house shipyards
     """
+    __slots__ = ()
+
     def spawn(self):
         """Return a move to spawn a new ship."""
         return commands.GENERATE
@@ -49,7 +42,12 @@ class Shipyard(Entity):
 class Ship(Entity):
     """
     Ship class to house ship entities
+
+    The same Ship object is kept for as long as the ship is alive, so bots may
+    attach their own per-ship attributes to it and find them again next turn.
     """
+    __slots__ = ('halite_amount', '__dict__')
+
     def __init__(self, owner, id, position, halite_amount):
         super().__init__(owner, id, position)
         self.halite_amount = halite_amount
@@ -79,16 +77,6 @@ class Ship(Entity):
         """
         return "{} {} {}".format(commands.MOVE, self.id, commands.STAY_STILL)
 
-    @staticmethod
-    def _generate(player_id):
-        """
-        Creates an instance of a ship for a given player given the engine's input.
-        :param player_id: The id of the player who owns this ship
-        :return: The ship id and ship object
-        """
-        ship_id, x_position, y_position, halite = map(int, read_input().split())
-        return ship_id, Ship(player_id, ship_id, Position(x_position, y_position), halite)
-
     def __repr__(self):
         return "{}(id={}, {}, cargo={} halite)".format(self.__class__.__name__,
                                                        self.id,
@@ -1,20 +1,163 @@
+import collections
+import heapq
+import math
 import queue
 
+import numpy as np
+
 from . import constants
 from .entity import Entity, Shipyard, Ship, Dropoff
+from .halite_index import HaliteIndex
 from .player import Player
 from .positionals import Direction, Position
-from .common import read_input
+
+# Cost of an impossible pairing when solving an assignment. Large, but finite to keep the arithmetic exact.
+_UNASSIGNABLE = 1e9
+
+
+def _solve_assignment(costs):
+    """
+    Finds the minimum-cost assignment of every row of a cost matrix to a distinct column,
+    using the Hungarian method with potentials, vectorized over the columns.
+    :param costs: A 2-D numpy array with no more rows than columns
+    :return: A list holding the column assigned to each row
+    """
+    num_rows, num_columns = costs.shape
+    padded_costs = np.zeros((num_rows + 1, num_columns + 1))
+    padded_costs[1:, 1:] = costs
+    row_potentials = np.zeros(num_rows + 1)
+    column_potentials = np.zeros(num_columns + 1)
+    # Rows and columns are 1-based below; column 0 is a sentinel and a column_rows of 0 means unassigned
+    column_rows = np.zeros(num_columns + 1, dtype=np.int64)
+    way = np.zeros(num_columns + 1, dtype=np.int64)
+
+    for row in range(1, num_rows + 1):
+        column_rows[0] = row
+        column = 0
+        min_slack = np.full(num_columns + 1, np.inf)
+        used = np.zeros(num_columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = column_rows[column]
+            slack = padded_costs[current_row] - row_potentials[current_row] - column_potentials
+            improved = ~used & (slack < min_slack)
+            min_slack[improved] = slack[improved]
+            way[improved] = column
+            free_slack = np.where(used, np.inf, min_slack)
+            next_column = int(np.argmin(free_slack))
+            delta = free_slack[next_column]
+            row_potentials[column_rows[used]] += delta
+            column_potentials[used] -= delta
+            min_slack[~used] -= delta
+            column = next_column
+            if column_rows[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous_column = way[column]
+            column_rows[column] = column_rows[previous_column]
+            column = previous_column
+
+    assignment = [0] * num_rows
+    for column in range(1, num_columns + 1):
+        if column_rows[column]:
+            assignment[column_rows[column] - 1] = column - 1
+    return assignment
+
+
+def _toroidal_diamond_sum(grid, radius):
+    """
+    For every cell, sums a grid over the cells within a Manhattan distance, wrapping around the edges.
+    Each distinct row offset adds one vectorized window sum along x, taken from circular prefix sums.
+    :param grid: A 2-D numpy array indexed as [y, x]
+    :param radius: The Manhattan distance
+    :return: A 2-D numpy array of sums indexed as [y, x]
+    """
+    height, width = grid.shape
+    # Prefix sums of each row repeated twice, so any window of up to width cells is one subtraction
+    prefix_sums = np.zeros((height, 2 * width + 1), dtype=np.int64)
+    np.cumsum(np.concatenate((grid, grid), axis=1), axis=1, out=prefix_sums[:, 1:])
+    columns = np.arange(width)
+    window_sums = {}
+    result = np.zeros((height, width), dtype=np.int64)
+    for row_shift in {dy % height for dy in range(-radius, radius + 1)}:
+        half_width = radius - min(row_shift, height - row_shift)
+        if half_width not in window_sums:
+            window = min(2 * half_width + 1, width)
+            starts = (columns - half_width) % width if window < width else np.zeros(width, dtype=np.int64)
+            window_sums[half_width] = prefix_sums[:, starts + window] - prefix_sums[:, starts]
+        result += np.roll(window_sums[half_width], row_shift, axis=0)
+    return result
+
+
+# Index tables of Manhattan rings and diamonds per map size and radius; see _get_index_table
+_index_tables = {}
+
+
+def _get_index_table(width, height, radius, diamond):
+    """
+    Returns, for every cell of a map size, the cells at exactly (or, for a diamond, within) a Manhattan
+    distance as indices into the flattened map. Offsets that wrap onto the same cell, or onto a cell closer
+    than radius, are dropped, and diamonds are ordered ring by ring. Built once per map size and radius.
+    :param width: The map width
+    :param height: The map height
+    :param radius: The Manhattan distance
+    :param diamond: Whether to include every cell within radius rather than only those at radius
+    :return: A 2-D numpy array whose row y * width + x lists the cells around (x, y)
+    """
+    key = (width, height, radius, diamond)
+    if key not in _index_tables:
+        if diamond:
+            table = np.concatenate([_get_index_table(width, height, ring_radius, False)
+                                    for ring_radius in range(radius + 1)], axis=1)
+        else:
+            offsets = set()
+            for dy in range(-radius, radius + 1):
+                for dx in {radius - abs(dy), abs(dy) - radius}:
+                    y_offset, x_offset = dy % height, dx % width
+                    if min(y_offset, height - y_offset) + min(x_offset, width - x_offset) == radius:
+                        offsets.add((y_offset, x_offset))
+            y_offsets, x_offsets = np.array(sorted(offsets), dtype=np.int64).reshape(-1, 2).T
+            ys, xs = np.divmod(np.arange(width * height), width)
+            table = ((ys[:, None] + y_offsets) % height * width + (xs[:, None] + x_offsets) % width)
+        _index_tables[key] = table.astype(np.int32)
+    return _index_tables[key]
 
 
 class MapCell:
     """A cell on the game map."""
-    def __init__(self, position, halite_amount):
+    def __init__(self, position, halite_grid, occupied_cells):
         self.position = position
-        self.halite_amount = halite_amount
-        self.ship = None
+        self._halite_grid = halite_grid
+        self._occupied_cells = occupied_cells
+        self._ship = None
         self.structure = None
 
+    @property
+    def ship(self):
+        """
+        :return: The ship in this cell, or None
+        """
+        return self._ship
+
+    @ship.setter
+    def ship(self, ship):
+        # Register newly occupied cells with the map so it only has to clear those next turn
+        if ship is not None and self._ship is None:
+            self._occupied_cells.append(self)
+        self._ship = ship
+
+    @property
+    def halite_amount(self):
+        """
+        :return: How much halite is in this cell, read from the map's halite grid
+        """
+        return int(self._halite_grid[self.position.y, self.position.x])
+
+    @halite_amount.setter
+    def halite_amount(self, halite_amount):
+        self._halite_grid[self.position.y, self.position.x] = halite_amount
+
     @property
     def is_empty(self):
         """
@@ -61,17 +204,68 @@ class MapCell:
         return 'MapCell({}, halite={})'.format(self.position, self.halite_amount)
 
 
+class _StructureField:
+    """
+    For every cell of the map: the distance to, the identity of and the first step toward
+    the nearest of a player's structures. Cells are indexed as y * width + x.
+    """
+    __slots__ = ('key', 'structures', 'distances', 'nearest', 'directions', 'distance_grid')
+
+    def __init__(self, key, structures, distances, nearest, directions, distance_grid):
+        self.key = key
+        self.structures = structures
+        self.distances = distances
+        self.nearest = nearest
+        self.directions = directions
+        self.distance_grid = distance_grid
+
+
+class _PathTree:
+    """
+    For every cell of the map: the halite a ship spends on the cheapest way to one structure, how
+    many moves that takes and the first move to make. Cells are indexed as y * width + x.
+    """
+    __slots__ = ('costs', 'steps', 'directions')
+
+    def __init__(self, costs, steps, directions):
+        self.costs = costs
+        self.steps = steps
+        self.directions = directions
+
+
 class GameMap:
     """
     The game map.
 
     Can be indexed by a position, or by a contained entity.
     Coordinates start at 0. Coordinates are normalized for you
+
+    The halite of every cell is also kept in halite_grid, a 2-D numpy array
+    indexed as [y, x], so whole-map sums, maxima and masks are single
+    vectorized calls. Cells read their halite_amount through to this array.
     """
-    def __init__(self, cells, width, height):
-        self.width = width
-        self.height = height
-        self._cells = cells
+    def __init__(self, halite_grid):
+        self.height, self.width = halite_grid.shape
+        self.halite_grid = halite_grid
+        self._occupied_cells = []
+        # One shared, normalized Position per cell, handed out by normalize and directional_offset
+        self._positions = [[Position(x, y) for x in range(self.width)] for y in range(self.height)]
+        self._cells = [[MapCell(position, halite_grid, self._occupied_cells) for position in row]
+                       for row in self._positions]
+
+        # Wrap-around distance along each axis indexed by coordinate difference modulo the map size
+        self._x_distances = [min(dx, self.width - dx) for dx in range(self.width)]
+        self._y_distances = [min(dy, self.height - dy) for dy in range(self.height)]
+        # The same tables repeated twice, so that a slice of them is the distance row from any coordinate
+        self._x_distance_table = np.array(self._x_distances * 2, dtype=np.int32)
+        self._y_distance_table = np.array(self._y_distances * 2, dtype=np.int32)
+
+        self._neighbours = None
+        self._structure_fields = {}
+        self._halite_index = None
+        # The players as of the last update, and values derived from them that are valid for this turn only
+        self._players = {}
+        self._turn_cache = {}
 
     def __getitem__(self, location):
         """
@@ -94,11 +288,20 @@ class GameMap:
         :param target: The target to where calculate
         :return: The distance between these items
         """
-        source = self.normalize(source)
-        target = self.normalize(target)
-        resulting_position = abs(source - target)
-        return min(resulting_position.x, self.width - resulting_position.x) + \
-            min(resulting_position.y, self.height - resulting_position.y)
+        return self._x_distances[(source.x - target.x) % self.width] + \
+            self._y_distances[(source.y - target.y) % self.height]
+
+    def calculate_distances(self, source):
+        """
+        Compute the Manhattan distance from one location to every cell of the map.
+        Accounts for wrap-around.
+        :param source: The source from where to calculate
+        :return: A 2-D numpy array of distances indexed as [y, x]
+        """
+        y_start = -source.y % self.height
+        x_start = -source.x % self.width
+        return np.add.outer(self._y_distance_table[y_start:y_start + self.height],
+                            self._x_distance_table[x_start:x_start + self.width])
 
     def normalize(self, position):
         """
@@ -109,7 +312,49 @@ class GameMap:
         :param position: A position object.
         :return: A normalized position object fitting within the bounds of the map
         """
-        return Position(position.x % self.width, position.y % self.height)
+        return self._positions[position.y % self.height][position.x % self.width]
+
+    def position_to_index(self, position):
+        """
+        :param position: A position object.
+        :return: The index of the position's cell in the flattened map, i.e. in halite_grid.ravel()
+        """
+        return (position.y % self.height) * self.width + position.x % self.width
+
+    def index_to_position(self, index):
+        """
+        :param index: The index of a cell in the flattened map
+        :return: The normalized position of that cell
+        """
+        return self._positions[index // self.width][index % self.width]
+
+    def get_ring_indices(self, position, radius):
+        """
+        Returns the cells at exactly a Manhattan distance from a position, each once, accounting for wrap-around.
+        :param position: The center of the ring
+        :param radius: The Manhattan distance
+        :return: A numpy array of indices into the flattened map, e.g. for gathering from halite_grid.ravel()
+        """
+        return _get_index_table(self.width, self.height, radius, False)[self.position_to_index(position)]
+
+    def get_diamond_indices(self, position, radius):
+        """
+        Returns the cells within a Manhattan distance from a position, each once, accounting for wrap-around.
+        The cells are ordered by distance from the position.
+        :param position: The center of the diamond
+        :param radius: The Manhattan distance
+        :return: A numpy array of indices into the flattened map
+        """
+        return _get_index_table(self.width, self.height, radius, True)[self.position_to_index(position)]
+
+    def directional_offset(self, position, direction):
+        """
+        Returns the normalized position one step away in a direction, without allocating a new Position.
+        :param position: A position object.
+        :param direction: the direction cardinal tuple
+        :return: The normalized position moved in that direction
+        """
+        return self._positions[(position.y + direction[1]) % self.height][(position.x + direction[0]) % self.width]
 
     @staticmethod
     def _get_target_direction(source, target):
@@ -164,32 +409,461 @@ class GameMap:
 
         return Direction.Still
 
+    def navigate_fleet(self, destinations, priorities=None, stacking_positions=()):
+        """
+        Returns collision-free moves for a whole fleet at once.
+
+        Every ship is given a distinct cell for next turn by solving a minimum-cost assignment over
+        the cells the fleet can reach, so ships may swap places or move into cells other ships are
+        leaving. A move that brings a ship closer to its destination costs nothing, staying still
+        costs 1 and moving away costs 2, each scaled by the ship's priority. Ships never move onto
+        cells marked unsafe by ships outside the fleet, nor make moves they cannot afford.
+        The chosen cells are marked unsafe.
+
+        :param destinations: A dict mapping each ship to move to its destination position
+        :param priorities: An optional dict mapping ship ids to weights. Defaults to favouring ships carrying
+                           more halite, so that full ships get their way.
+        :param stacking_positions: Positions any number of ships may move onto, e.g. your shipyard at the end of
+                                   the game when collisions there no longer matter
+        :return: A dict mapping ship ids to directions
+        """
+        stacking_positions = {self.normalize(position) for position in stacking_positions}
+        ship_options = {}
+        for ship, destination in destinations.items():
+            if priorities is not None:
+                weight = priorities[ship.id]
+            else:
+                weight = 1 + ship.halite_amount / constants.MAX_HALITE
+            distance = self.calculate_distance(ship.position, destination)
+            move_cost = self[ship.position].halite_amount // constants.MOVE_COST_RATIO
+            directions = [Direction.Still]
+            if ship.halite_amount >= move_cost:
+                directions.extend(Direction.get_all_cardinals())
+
+            options = []
+            for direction in directions:
+                target = self.directional_offset(ship.position, direction)
+                occupant = self[target].ship
+                if direction != Direction.Still and occupant is not None and occupant not in destinations:
+                    continue
+                cost = weight * (self.calculate_distance(target, destination) - distance + 1)
+                # A cell any number of ships may enter is a separate slot for each ship
+                slot = (target, ship.id) if target in stacking_positions else target
+                options.append((slot, direction, cost))
+            ship_options[ship] = options
+
+        # Ships only compete with ships that can reach one of the same cells, so solve each
+        # group of ships linked by shared cells separately
+        slot_parents = {}
+
+        def find(slot):
+            while slot_parents[slot] != slot:
+                slot_parents[slot] = slot_parents[slot_parents[slot]]
+                slot = slot_parents[slot]
+            return slot
+
+        for options in ship_options.values():
+            for slot, _, _ in options:
+                slot_parents.setdefault(slot, slot)
+            root = find(options[0][0])
+            for slot, _, _ in options[1:]:
+                slot_parents[find(slot)] = root
+
+        groups = {}
+        for ship, options in ship_options.items():
+            groups.setdefault(find(options[0][0]), []).append(ship)
+
+        moves = {}
+        for ships in groups.values():
+            if len(ships) == 1:
+                choices = [min(ship_options[ships[0]], key=lambda option: option[2])]
+            else:
+                slots = list({slot: None for ship in ships for slot, _, _ in ship_options[ship]})
+                slot_columns = {slot: column for column, slot in enumerate(slots)}
+                costs = np.full((len(ships), len(slots)), _UNASSIGNABLE)
+                for row, ship in enumerate(ships):
+                    for slot, _, cost in ship_options[ship]:
+                        costs[row, slot_columns[slot]] = cost
+                assignment = _solve_assignment(costs)
+                # A ship only ends up on a cell it cannot reach if ships already share a cell; it then stays still
+                choices = []
+                for ship, column in zip(ships, assignment):
+                    reachable = {option[0]: option for option in ship_options[ship]}
+                    choices.append(reachable.get(slots[column], ship_options[ship][0]))
+
+            for ship, (slot, direction, _) in zip(ships, choices):
+                moves[ship.id] = direction
+                if isinstance(slot, Position):
+                    self[slot].mark_unsafe(ship)
+        return moves
+
+    def _get_neighbours(self):
+        """
+        Builds (once) the table of neighbouring cells, as (direction, cell index) pairs for each cell index
+        :return: A list indexed by y * width + x
+        """
+        if self._neighbours is None:
+            self._neighbours = []
+            for row in self._positions:
+                for position in row:
+                    cells = []
+                    for direction in Direction.get_all_cardinals():
+                        neighbour = self.directional_offset(position, direction)
+                        cells.append((direction, neighbour.y * self.width + neighbour.x))
+                    self._neighbours.append(cells)
+        return self._neighbours
+
+    def _get_structure_field(self, player):
+        """
+        Returns the field of nearest friendly structures for a player, rebuilding it only if
+        the player's set of structures changed since it was last built.
+        :param player: The player whose shipyard and dropoffs to consider
+        :return: A _StructureField
+        """
+        structures = [player.shipyard] + player.get_dropoffs()
+        key = tuple(structure.id for structure in structures)
+        field = self._structure_fields.get(player.id)
+        if field is None or field.key != key:
+            field = self._build_structure_field(key, structures)
+            self._structure_fields[player.id] = field
+        return field
+
+    def _build_structure_field(self, key, structures):
+        """
+        Breadth-first search on the torus started from all structures at once.
+        :param key: The key identifying this set of structures
+        :param structures: The structures to search from
+        :return: A _StructureField
+        """
+        num_cells = self.width * self.height
+        distances = [-1] * num_cells
+        nearest = [None] * num_cells
+        directions = [Direction.Still] * num_cells
+        frontier = collections.deque()
+        for structure in structures:
+            index = structure.position.y * self.width + structure.position.x
+            if distances[index] < 0:
+                distances[index] = 0
+                nearest[index] = structure
+                frontier.append(index)
+
+        neighbours = self._get_neighbours()
+        while frontier:
+            index = frontier.popleft()
+            for direction, neighbour in neighbours[index]:
+                if distances[neighbour] < 0:
+                    distances[neighbour] = distances[index] + 1
+                    nearest[neighbour] = nearest[index]
+                    directions[neighbour] = Direction.invert(direction)
+                    frontier.append(neighbour)
+
+        distance_grid = np.array(distances, dtype=np.int32).reshape(self.height, self.width)
+        return _StructureField(key, structures, distances, nearest, directions, distance_grid)
+
+    def get_structure_distances(self, player):
+        """
+        Returns the distance from every cell to the nearest of a player's shipyard and dropoffs.
+        The result is cached and only recomputed when the player's structures change.
+        :param player: The player whose structures to consider
+        :return: A 2-D numpy array of distances indexed as [y, x]
+        """
+        return self._get_structure_field(player).distance_grid
+
+    def get_nearest_structure(self, player, position):
+        """
+        Returns the nearest of a player's shipyard and dropoffs to a position.
+        :param player: The player whose structures to consider
+        :param position: The position to search from
+        :return: A tuple of the structure and its distance
+        """
+        field = self._get_structure_field(player)
+        index = (position.y % self.height) * self.width + position.x % self.width
+        return field.nearest[index], field.distances[index]
+
+    def get_direction_to_nearest_structure(self, player, position):
+        """
+        Returns a direction along a shortest path to the nearest of a player's structures.
+        This does not account for collisions.
+        :param player: The player whose structures to consider
+        :param position: The position to move from
+        :return: A direction, Still if the position holds one of the structures
+        """
+        field = self._get_structure_field(player)
+        return field.directions[(position.y % self.height) * self.width + position.x % self.width]
+
+    def _get_ship_counts(self, player_id=None):
+        """
+        :param player_id: Only count this player's ships, or None for every player's
+        :return: A 2-D numpy array, indexed as [y, x], of the number of ships in each cell
+        """
+        key = ('ship_counts', player_id)
+        if key not in self._turn_cache:
+            counts = np.zeros((self.height, self.width), dtype=np.int32)
+            for player in self._players.values():
+                if player_id is None or player.id == player_id:
+                    for ship in player.get_ships():
+                        counts[ship.position.y % self.height, ship.position.x % self.width] += 1
+            self._turn_cache[key] = counts
+        return self._turn_cache[key]
+
+    def get_inspiration_counts(self, player):
+        """
+        Returns, for every cell, how many opponent ships are within the inspiration radius.
+        Computed once per turn.
+        :param player: The player whose opponents to count
+        :return: A 2-D numpy array of ship counts indexed as [y, x]
+        """
+        key = ('inspiration_counts', player.id)
+        if key not in self._turn_cache:
+            radius = constants.INSPIRATION_RADIUS
+            nearby_ships = self._turn_cache.get('nearby_ships')
+            if nearby_ships is None:
+                nearby_ships = _toroidal_diamond_sum(self._get_ship_counts(), radius)
+                self._turn_cache['nearby_ships'] = nearby_ships
+            self._turn_cache[key] = nearby_ships - _toroidal_diamond_sum(self._get_ship_counts(player.id), radius)
+        return self._turn_cache[key]
+
+    def get_inspired_mask(self, player):
+        """
+        Returns, for every cell, whether a ship of this player there would be inspired.
+        :param player: The player whose ships to consider
+        :return: A 2-D boolean numpy array indexed as [y, x]
+        """
+        if not constants.INSPIRATION_ENABLED:
+            return np.zeros((self.height, self.width), dtype=bool)
+        return self.get_inspiration_counts(player) >= constants.INSPIRATION_SHIP_COUNT
+
+    def _get_halite_integral(self):
+        """
+        Builds (once per turn) the summed-area table of the halite grid tiled two by two, so that
+        any rectangle of up to the map's size is four lookups regardless of wrap-around.
+        :return: A 2-D numpy array where [y, x] is the halite in the tiled rows < y and columns < x
+        """
+        integral = self._turn_cache.get('halite_integral')
+        if integral is None:
+            integral = np.zeros((2 * self.height + 1, 2 * self.width + 1), dtype=np.int64)
+            tiled = np.tile(self.halite_grid, (2, 2))
+            np.cumsum(np.cumsum(tiled, axis=0), axis=1, out=integral[1:, 1:])
+            self._turn_cache['halite_integral'] = integral
+        return integral
+
+    def _get_diamond_size(self, radius):
+        """
+        :param radius: The Manhattan distance
+        :return: How many distinct cells lie within radius of any cell, accounting for wrap-around
+        """
+        return sum(min(2 * (radius - min(row_shift, self.height - row_shift)) + 1, self.width)
+                   for row_shift in {dy % self.height for dy in range(-radius, radius + 1)})
+
+    def get_region_halite(self, position, radius, diamond=False):
+        """
+        Returns the total halite in the square, or the diamond, of cells within radius of a position.
+        Squares are answered in constant time from a summed-area table; diamonds from the cached
+        result of get_neighbourhood_halite, so only the first diamond query of a radius each turn
+        costs a pass over the map.
+        :param position: The center of the region
+        :param radius: How far the region extends from its center, per axis for a square, in
+                       Manhattan distance for a diamond
+        :param diamond: Whether the region is a diamond rather than a square
+        :return: The total halite in the region
+        """
+        if diamond:
+            return int(self.get_neighbourhood_halite(radius, diamond=True)[position.y % self.height,
+                                                                           position.x % self.width])
+        integral = self._get_halite_integral()
+        rows = min(2 * radius + 1, self.height)
+        columns = min(2 * radius + 1, self.width)
+        top = (position.y - radius) % self.height if rows < self.height else 0
+        left = (position.x - radius) % self.width if columns < self.width else 0
+        return int(integral[top + rows, left + columns] - integral[top, left + columns] -
+                   integral[top + rows, left] + integral[top, left])
+
+    def get_region_mean_halite(self, position, radius, diamond=False):
+        """
+        Returns the mean halite per cell in the square, or the diamond, of cells within radius of a position.
+        See get_region_halite.
+        :param position: The center of the region
+        :param radius: How far the region extends from its center
+        :param diamond: Whether the region is a diamond rather than a square
+        :return: The mean halite per cell of the region
+        """
+        if diamond:
+            size = self._get_diamond_size(radius)
+        else:
+            size = min(2 * radius + 1, self.height) * min(2 * radius + 1, self.width)
+        return self.get_region_halite(position, radius, diamond) / size
+
+    def get_neighbourhood_halite(self, radius, diamond=False):
+        """
+        Returns, for every cell at once, the total halite in the square or diamond of cells within radius.
+        Computed once per turn and radius.
+        :param radius: How far each region extends from its center
+        :param diamond: Whether the regions are diamonds rather than squares
+        :return: A 2-D numpy array of totals indexed as [y, x]
+        """
+        key = ('neighbourhood_halite', radius, diamond)
+        if key not in self._turn_cache:
+            if diamond:
+                totals = _toroidal_diamond_sum(self.halite_grid, radius)
+            else:
+                integral = self._get_halite_integral()
+                rows = min(2 * radius + 1, self.height)
+                columns = min(2 * radius + 1, self.width)
+                tops = (np.arange(self.height) - radius) % self.height if rows < self.height \
+                    else np.zeros(self.height, dtype=np.int64)
+                lefts = (np.arange(self.width) - radius) % self.width if columns < self.width \
+                    else np.zeros(self.width, dtype=np.int64)
+                bottoms = tops + rows
+                rights = lefts + columns
+                totals = integral[np.ix_(bottoms, rights)] - integral[np.ix_(tops, rights)] - \
+                    integral[np.ix_(bottoms, lefts)] + integral[np.ix_(tops, lefts)]
+            self._turn_cache[key] = totals
+        return self._turn_cache[key]
+
+    def get_richest_cells(self, count, position=None, radius=None):
+        """
+        Returns the cells with the most halite, on the whole map or within a Manhattan distance of a position.
+        Answered from an index of cells by halite that is kept current from the engine's list of changed
+        cells, so only the richest cells are examined. Around a position, at most as many cells as the
+        region holds are examined before falling back to a vectorized scan of the region's cells, so
+        either way the cost is bounded by the size of the region.
+        :param count: How many cells to return at most
+        :param position: If given, only consider cells within radius of this position
+        :param radius: The Manhattan distance from position, required with position
+        :return: A list of positions, richest first
+        """
+        if position is not None and radius is None:
+            raise ValueError("A radius is needed to find the richest cells around a position.")
+        if self._halite_index is None:
+            self._halite_index = HaliteIndex(self.halite_grid.ravel())
+
+        if position is None:
+            indices = self._halite_index.top(count)
+        else:
+            x_position = position.x % self.width
+            y_position = position.y % self.height
+
+            def is_within_radius(index):
+                # A negative coordinate difference indexes the distance tables from the end, i.e. wraps around
+                y, x = divmod(index, self.width)
+                return self._x_distances[x - x_position] + self._y_distances[y - y_position] <= radius
+
+            indices = self._halite_index.top(count, is_within_radius, self._get_diamond_size(radius))
+            if indices is None:
+                cells = self.get_diamond_indices(position, radius)
+                halite = self.halite_grid.ravel()[cells]
+                indices = cells[np.lexsort((cells, -halite))[:count]].tolist()
+        return [self.index_to_position(index) for index in indices]
+
+    def _get_path_tree(self, structure):
+        """
+        Returns the cheapest-path tree into a structure, building it at most once per turn.
+        :param structure: The shipyard or dropoff the paths lead to
+        :return: A _PathTree
+        """
+        key = ('path_tree', structure.owner, structure.id)
+        if key not in self._turn_cache:
+            self._turn_cache[key] = self._build_path_tree(structure)
+        return self._turn_cache[key]
+
+    def _build_path_tree(self, structure):
+        """
+        Dijkstra's algorithm run backwards from a structure. Moving off a cell costs 1/MOVE_COST_RATIO of
+        its halite (truncated); among equally cheap paths the one with fewer moves wins.
+        :param structure: The shipyard or dropoff the paths lead to
+        :return: A _PathTree
+        """
+        num_cells = self.width * self.height
+        move_costs = (self.halite_grid.ravel() // constants.MOVE_COST_RATIO).tolist()
+        # Costs and moves are combined into one integer key, cost first, so the heap compares plain ints.
+        # A path has fewer than num_cells moves, so they never carry over into the cost.
+        step_weight = num_cells
+        directions = [Direction.Still] * num_cells
+        target = structure.position.y % self.height * self.width + structure.position.x % self.width
+        frontier = [(0, target)]
+        neighbours = self._get_neighbours()
+        inverted = {direction: Direction.invert(direction) for direction in Direction.get_all_cardinals()}
+        # Every cell of the torus is reachable; paths can cost any amount of halite
+        keys = [math.inf] * num_cells
+        keys[target] = 0
+        while frontier:
+            key, index = heapq.heappop(frontier)
+            if key != keys[index]:
+                continue
+            for direction, neighbour in neighbours[index]:
+                neighbour_key = key + move_costs[neighbour] * step_weight + 1
+                if neighbour_key < keys[neighbour]:
+                    keys[neighbour] = neighbour_key
+                    directions[neighbour] = inverted[direction]
+                    heapq.heappush(frontier, (neighbour_key, neighbour))
+
+        costs = [key // step_weight for key in keys]
+        steps = [key % step_weight for key in keys]
+        return _PathTree(costs, steps, directions)
+
+    def get_cheapest_direction(self, structure, position):
+        """
+        Returns the first move of the path to a structure that spends the least halite on moving.
+        The paths are computed once per turn per structure, after which this is a lookup.
+        This does not account for collisions.
+        :param structure: The shipyard or dropoff to go to
+        :param position: The position to move from
+        :return: A direction, Still if the position holds the structure
+        """
+        return self._get_path_tree(structure).directions[self.position_to_index(position)]
+
+    def get_cheapest_path_cost(self, structure, position):
+        """
+        Returns how much halite the cheapest path from a position to a structure spends on moving,
+        and how many moves it takes.
+        :param structure: The shipyard or dropoff to go to
+        :param position: The position to move from
+        :return: A tuple of the halite cost and the number of moves
+        """
+        tree = self._get_path_tree(structure)
+        index = self.position_to_index(position)
+        return tree.costs[index], tree.steps[index]
+
+    def get_cheapest_structure(self, player, position):
+        """
+        Returns which of a player's shipyard and dropoffs can be reached from a position for the least halite.
+        :param player: The player whose structures to consider
+        :param position: The position to move from
+        :return: The structure
+        """
+        return min([player.shipyard] + player.get_dropoffs(),
+                   key=lambda structure: self.get_cheapest_path_cost(structure, position))
+
     @staticmethod
-    def _generate():
+    def _generate(reader):
         """
         Creates a map object from the input given by the game engine
+        :param reader: The FrameReader holding the engine's input
         :return: The map object
         """
-        map_width, map_height = map(int, read_input().split())
-        game_map = [[None for _ in range(map_width)] for _ in range(map_height)]
-        for y_position in range(map_height):
-            cells = read_input().split()
-            for x_position in range(map_width):
-                game_map[y_position][x_position] = MapCell(Position(x_position, y_position),
-                                                           int(cells[x_position]))
-        return GameMap(game_map, map_width, map_height)
+        map_width, map_height = reader.read_ints(2)
+        halite_grid = np.array(reader.read_ints(map_width * map_height), dtype=np.int32)
+        return GameMap(halite_grid.reshape(map_height, map_width))
 
-    def _update(self):
+    def _update(self, reader, players):
         """
         Updates this map object from the input given by the game engine
+        :param reader: The FrameReader holding the engine's input
+        :param players: The players, already updated for this turn
         :return: nothing
         """
+        self._players = players
+        self._turn_cache = {}
+
         # Mark cells as safe for navigation (will re-mark unsafe cells
-        # later)
-        for y in range(self.height):
-            for x in range(self.width):
-                self[Position(x, y)].ship = None
-
-        for _ in range(int(read_input())):
-            cell_x, cell_y, cell_energy = map(int, read_input().split())
-            self[Position(cell_x, cell_y)].halite_amount = cell_energy
+        # later). Only cells marked since the last update can hold a ship.
+        for cell in self._occupied_cells:
+            cell.ship = None
+        self._occupied_cells.clear()
+
+        num_cells = reader.read_int()
+        cells = np.array(reader.read_ints(3 * num_cells), dtype=np.int32).reshape(num_cells, 3)
+        self.halite_grid[cells[:, 1], cells[:, 0]] = cells[:, 2]
+        if self._halite_index is not None:
+            for cell_x, cell_y, cell_energy in cells.tolist():
+                self._halite_index.update(cell_y * self.width + cell_x, cell_energy)
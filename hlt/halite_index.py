@@ -0,0 +1,71 @@
+"""
+An index of the map's cells by halite amount, for finding the richest cells without scanning the map.
+"""
+
+# How much halite each bucket of the index covers
+BUCKET_SIZE = 16
+
+
+class HaliteIndex:
+    """
+    Cells bucketed by their halite amount, BUCKET_SIZE halite per bucket.
+
+    Cells are referred to by their index in the flattened map. Only cells whose halite changes
+    are moved between buckets, so keeping the index current costs as much as the engine's list of
+    changed cells, and the richest cells are found by walking the buckets down from the top.
+    """
+    def __init__(self, halite_amounts):
+        """
+        :param halite_amounts: The halite of every cell, in flattened map order
+        """
+        self._amounts = [int(amount) for amount in halite_amounts]
+        self._buckets = {}
+        for index, amount in enumerate(self._amounts):
+            self._buckets.setdefault(amount // BUCKET_SIZE, set()).add(index)
+        self._top_bucket = max(self._buckets, default=0)
+
+    def update(self, index, amount):
+        """
+        Records a cell's new halite amount.
+        :param index: The cell's index in the flattened map
+        :param amount: The cell's halite
+        :return: nothing.
+        """
+        old_bucket = self._amounts[index] // BUCKET_SIZE
+        new_bucket = amount // BUCKET_SIZE
+        self._amounts[index] = amount
+        if old_bucket != new_bucket:
+            cells = self._buckets[old_bucket]
+            cells.discard(index)
+            if not cells:
+                del self._buckets[old_bucket]
+            self._buckets.setdefault(new_bucket, set()).add(index)
+            self._top_bucket = max(self._top_bucket, new_bucket)
+
+    def top(self, count, accept=None, max_scanned=None):
+        """
+        Returns the richest cells, richest first. Ties are broken by index.
+        :param count: How many cells to return at most
+        :param accept: An optional function of a cell index; cells for which it is false are skipped
+        :param max_scanned: Give up after examining more than this many cells
+        :return: A list of cell indices, or None if more than max_scanned cells had to be examined
+        """
+        while self._top_bucket > 0 and self._top_bucket not in self._buckets:
+            self._top_bucket -= 1
+
+        found = []
+        scanned = 0
+        for bucket in range(self._top_bucket, -1, -1):
+            cells = self._buckets.get(bucket)
+            if not cells:
+                continue
+            scanned += len(cells)
+            if accept is not None:
+                cells = [index for index in cells if accept(index)]
+            # Sorting is stable, so sorting by index first breaks ties by index
+            found.extend(sorted(sorted(cells), key=self._amounts.__getitem__, reverse=True))
+            if len(found) >= count:
+                break
+            if max_scanned is not None and scanned > max_scanned:
+                return None
+        return found[:count]
@@ -1,40 +1,142 @@
 import json
 import logging
 import sys
+import threading
+import time
 
-from .common import read_input
 from . import constants
 from .game_map import GameMap, Player
+from .profiling import NO_SPAN, FALLBACK_SPAN, PARSE_SPAN, SEND_SPAN, USER_SPAN, Profiler
+from .snapshot import Snapshot
+
+_READ_CHUNK_SIZE = 1 << 16
+
+# The engine allows this many seconds per turn
+DEFAULT_TURN_TIME_LIMIT = 2.0
+# Fallback commands are sent this many seconds before the turn time limit runs out
+DEFAULT_SAFETY_MARGIN = 0.25
+
+
+class FrameReader:
+    """
+    Reads the engine's input from a binary stream.
+
+    The engine writes a whole turn at once, so instead of reading, splitting and
+    converting one line at a time the reader pulls everything available from the
+    stream in one go and tokenizes it into integers in a single pass. Update methods
+    then take their integers from that buffer.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._pending = b''
+        self._tokens = []
+        self._cursor = 0
+
+    def _fill(self):
+        """
+        Reads whatever input is available, shutting down logging and exiting if the engine closed the stream
+        :return: nothing.
+        """
+        chunk = self._stream.read1(_READ_CHUNK_SIZE)
+        if not chunk:
+            logging.shutdown()
+            raise SystemExit("EOF when reading engine input")
+        self._pending += chunk
+
+    def _tokenize(self):
+        """
+        Converts every complete token of pending input to an integer, reading more input if there is none.
+        :return: nothing.
+        """
+        end = max(self._pending.rfind(b' '), self._pending.rfind(b'\n'))
+        while end < 0:
+            self._fill()
+            end = max(self._pending.rfind(b' '), self._pending.rfind(b'\n'))
+        del self._tokens[:self._cursor]
+        self._cursor = 0
+        self._tokens.extend(map(int, self._pending[:end].split()))
+        self._pending = self._pending[end + 1:]
+
+    def read_line(self):
+        """
+        Reads a raw line of input. Only meant for the constants JSON sent before any integers.
+        :return: the line read, without its line ending
+        """
+        while b'\n' not in self._pending:
+            self._fill()
+        line, _, self._pending = self._pending.partition(b'\n')
+        return line.decode()
+
+    def read_ints(self, count):
+        """
+        :param count: How many integers to read
+        :return: A list with the next count integers of input
+        """
+        while len(self._tokens) - self._cursor < count:
+            self._tokenize()
+        start = self._cursor
+        self._cursor += count
+        return self._tokens[start:self._cursor]
+
+    def read_int(self):
+        """
+        :return: The next integer of input
+        """
+        return self.read_ints(1)[0]
 
 
 class Game:
     """
     The game object holds all metadata pertinent to the game and all its contents
+
+    It also keeps track of the time spent on each turn: update_frame timestamps the arrival of
+    the turn, time_remaining reports what is left of the turn time limit, and commands registered
+    with set_fallback_commands are sent on your behalf if end_turn has not been called by the time
+    only safety_margin seconds remain. After fallback commands, the next turn's clock starts when
+    they were sent, since that is when the engine moves on.
+
+    With profile set, every turn is split into spans, timing how long update_frame took to parse
+    the turn (parse), your code took until end_turn (user) and the commands took to send (send).
+    Your own spans are added with span(). The trace is written to profile-<id>.json on exit.
     """
-    def __init__(self):
+    def __init__(self, turn_time_limit=DEFAULT_TURN_TIME_LIMIT, safety_margin=DEFAULT_SAFETY_MARGIN, profile=False):
         """
         Initiates a game object collecting all start-state instances for the contained items for pre-game.
         Also sets up basic logging.
+        :param turn_time_limit: How many seconds the engine allows per turn
+        :param safety_margin: How many seconds before the limit fallback commands are sent
+        :param profile: Whether to record per turn spans, see hlt.profiling
         """
         self.turn_number = 0
+        self.turn_time_limit = turn_time_limit
+        self.safety_margin = safety_margin
+        self._reader = FrameReader(sys.stdin.buffer)
+        self._turn_started = time.perf_counter()
+        self._parse_ended = self._turn_started
+        self._turn_ended = False
+        self._fallback_timer = None
+        # When the last fallback commands went out, as the engine starts the next turn's clock then
+        self._fallback_sent_at = None
+        self._send_lock = threading.Lock()
 
         # Grab constants JSON
-        raw_constants = read_input()
+        raw_constants = self._reader.read_line()
         constants.load_constants(json.loads(raw_constants))
 
-        num_players, self.my_id = map(int, read_input().split())
+        num_players, self.my_id = self._reader.read_ints(2)
 
         logging.basicConfig(
             filename="bot-{}.log".format(self.my_id),
             filemode="w",
             level=logging.DEBUG,
         )
+        self.profiler = Profiler("profile-{}.json".format(self.my_id)) if profile else None
 
         self.players = {}
         for player in range(num_players):
-            self.players[player] = Player._generate()
+            self.players[player] = Player._generate(self._reader)
         self.me = self.players[self.my_id]
-        self.game_map = GameMap._generate()
+        self.game_map = GameMap._generate(self._reader)
 
     def ready(self, name):
         """
@@ -48,14 +150,22 @@ class Game:
         Updates the game object's state.
         :returns: nothing.
         """
-        self.turn_number = int(read_input())
+        self.turn_number = self._reader.read_int()
+        self._turn_started = time.perf_counter()
+        if self._fallback_sent_at is not None:
+            # The engine sent this turn as soon as it got the fallback, which may have been long before we got here
+            self._turn_started = min(self._turn_started, self._fallback_sent_at)
+            self._fallback_sent_at = None
+        self._turn_ended = False
+        if self.profiler is not None:
+            self.profiler.turn_number = self.turn_number
         logging.info("=============== TURN {:03} ================".format(self.turn_number))
 
         for _ in range(len(self.players)):
-            player, num_ships, num_dropoffs, halite = map(int, read_input().split())
-            self.players[player]._update(num_ships, num_dropoffs, halite)
+            player, num_ships, num_dropoffs, halite = self._reader.read_ints(4)
+            self.players[player]._update(num_ships, num_dropoffs, halite, self._reader)
 
-        self.game_map._update()
+        self.game_map._update(self._reader, self.players)
 
         # Mark cells with ships as unsafe for navigation
         for player in self.players.values():
@@ -66,14 +176,97 @@ class Game:
             for dropoff in player.get_dropoffs():
                 self.game_map[dropoff.position].structure = dropoff
 
-    @staticmethod
-    def end_turn(commands):
+        if self.profiler is not None:
+            self._parse_ended = time.perf_counter()
+            self.profiler.record(PARSE_SPAN, self._parse_ended - self._turn_started)
+
+    def span(self, name):
+        """
+        Times a block of your code when profiling, e.g. `with game.span('navigate'):`.
+        Spans inside other spans are recorded as parent/child.
+        :param name: The span name
+        :return: A context manager, which does nothing when not profiling
+        """
+        if self.profiler is None:
+            return NO_SPAN
+        return self.profiler.span(name)
+
+    def snapshot(self):
+        """
+        Takes a compact, copy-on-write snapshot of the current game state for lookahead search.
+        :return: A Snapshot
+        """
+        return Snapshot.from_game(self)
+
+    def time_elapsed(self):
+        """
+        :return: How many seconds have passed since the current turn arrived
+        """
+        return time.perf_counter() - self._turn_started
+
+    def time_remaining(self):
+        """
+        :return: How many seconds are left before the turn time limit, negative once it has passed
+        """
+        return self.turn_time_limit - self.time_elapsed()
+
+    def set_fallback_commands(self, commands):
+        """
+        Registers commands to send in place of yours if this turn is about to run out of time,
+        e.g. every ship staying still. Fallback commands only apply to the current turn and
+        replace any registered before.
+        :param commands: Array of commands to send to engine
+        :return: nothing.
+        """
+        with self._send_lock:
+            if self._fallback_timer is not None:
+                self._fallback_timer.cancel()
+            delay = max(0.0, self.time_remaining() - self.safety_margin)
+            self._fallback_timer = threading.Timer(delay, self._send_fallback, (self.turn_number, list(commands)))
+            self._fallback_timer.daemon = True
+            self._fallback_timer.start()
+
+    def _send_fallback(self, turn_number, commands):
+        """
+        Sends the fallback commands of a turn, unless that turn has already ended.
+        :param turn_number: The turn the commands were registered for
+        :param commands: Array of commands to send to engine
+        :return: nothing.
+        """
+        with self._send_lock:
+            if self._turn_ended or turn_number != self.turn_number:
+                return
+            self._turn_ended = True
+            logging.warning("Turn {} is about to time out, sending fallback commands.".format(turn_number))
+            started = time.perf_counter()
+            send_commands(commands)
+            self._fallback_sent_at = time.perf_counter()
+            if self.profiler is not None:
+                self.profiler.record(FALLBACK_SPAN, self._fallback_sent_at - started)
+
+    def end_turn(self, commands):
         """
         Method to send all commands to the game engine, effectively ending your turn.
+        If the fallback commands were already sent this turn, these commands are dropped.
         :param commands: Array of commands to send to engine
         :return: nothing.
         """
-        send_commands(commands)
+        started = time.perf_counter()
+        if self.profiler is not None:
+            # Recorded even when the fallback already ended the turn: those are the turns that ran out of time
+            self.profiler.record(USER_SPAN, started - self._parse_ended)
+        with self._send_lock:
+            if self._fallback_timer is not None:
+                self._fallback_timer.cancel()
+                self._fallback_timer = None
+            if self._turn_ended:
+                logging.warning("Turn {} already ended with fallback commands, dropping late commands."
+                                .format(self.turn_number))
+                return
+            self._turn_ended = True
+            send_commands(commands)
+            if self.profiler is not None:
+                self.profiler.record(SEND_SPAN, time.perf_counter() - started)
 
 
 def send_commands(commands):
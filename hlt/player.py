@@ -1,10 +1,12 @@
 from .entity import Shipyard, Ship, Dropoff
 from .positionals import Position
-from .common import read_input
 
 class Player:
     """
     Player object containing all items/metadata pertinent to the player.
+
+    After every update spawned_ship_ids and destroyed_ship_ids hold the ids of
+    the ships that appeared and disappeared since the previous turn.
     """
     def __init__(self, player_id, shipyard, halite=0):
         self.id = player_id
@@ -12,6 +14,8 @@ class Player:
         self.halite_amount = halite
         self._ships = {}
         self._dropoffs = {}
+        self.spawned_ship_ids = []
+        self.destroyed_ship_ids = []
 
     def get_ship(self, ship_id):
         """
@@ -55,22 +59,51 @@ class Player:
 
 
     @staticmethod
-    def _generate():
+    def _generate(reader):
         """
         Creates a player object from the input given by the game engine
+        :param reader: The FrameReader holding the engine's input
         :return: The player object
         """
-        player, shipyard_x, shipyard_y = map(int, read_input().split())
+        player, shipyard_x, shipyard_y = reader.read_ints(3)
         return Player(player, Shipyard(player, -1, Position(shipyard_x, shipyard_y)))
 
-    def _update(self, num_ships, num_dropoffs, halite):
+    def _update(self, num_ships, num_dropoffs, halite, reader):
         """
         Updates this player object considering the input from the game engine for the current specific turn.
         :param num_ships: The number of ships this player has this turn
         :param num_dropoffs: The number of dropoffs this player has this turn
         :param halite: How much halite the player has in total
+        :param reader: The FrameReader holding the engine's input
         :return: nothing.
         """
         self.halite_amount = halite
-        self._ships = {id: ship for (id, ship) in [Ship._generate(self.id) for _ in range(num_ships)]}
-        self._dropoffs = {id: dropoff for (id, dropoff) in [Dropoff._generate(self.id) for _ in range(num_dropoffs)]}
+
+        # Ships and dropoffs that already exist are updated in place rather than rebuilt, so
+        # anything attached to them survives; whatever is left in previous_ships was destroyed.
+        previous_ships = self._ships
+        self._ships = {}
+        self.spawned_ship_ids = []
+        ship_data = reader.read_ints(4 * num_ships)
+        for index in range(0, len(ship_data), 4):
+            ship_id, x_position, y_position, ship_halite = ship_data[index:index + 4]
+            ship = previous_ships.pop(ship_id, None)
+            if ship is None:
+                ship = Ship(self.id, ship_id, Position(x_position, y_position), ship_halite)
+                self.spawned_ship_ids.append(ship_id)
+            else:
+                if ship.position.x != x_position or ship.position.y != y_position:
+                    ship.position = Position(x_position, y_position)
+                ship.halite_amount = ship_halite
+            self._ships[ship_id] = ship
+        self.destroyed_ship_ids = list(previous_ships)
+
+        previous_dropoffs = self._dropoffs
+        self._dropoffs = {}
+        dropoff_data = reader.read_ints(3 * num_dropoffs)
+        for index in range(0, len(dropoff_data), 3):
+            dropoff_id, x_position, y_position = dropoff_data[index:index + 3]
+            dropoff = previous_dropoffs.get(dropoff_id)
+            if dropoff is None:
+                dropoff = Dropoff(self.id, dropoff_id, Position(x_position, y_position))
+            self._dropoffs[dropoff_id] = dropoff
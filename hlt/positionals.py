@@ -62,9 +62,16 @@ class Direction:
 
 
 class Position:
+    """
+    An immutable x, y pair on the game map.
+
+    Positions hash by value, so they can be kept in sets and used as dict keys.
+    """
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        object.__setattr__(self, 'x', x)
+        object.__setattr__(self, 'y', y)
 
     def directional_offset(self, direction):
         """
@@ -72,7 +79,7 @@ class Position:
         :param direction: the direction cardinal tuple
         :return: a new position moved in that direction
         """
-        return self + Position(*direction)
+        return Position(self.x + direction[0], self.y + direction[1])
 
     def get_surrounding_cardinals(self):
         """
@@ -86,24 +93,25 @@ class Position:
     def __sub__(self, other):
         return Position(self.x - other.x, self.y - other.y)
 
-    def __iadd__(self, other):
-        self.x += other.x
-        self.y += other.y
-        return self
-
-    def __isub__(self, other):
-        self.x -= other.x
-        self.y -= other.y
-        return self
-
     def __abs__(self):
         return Position(abs(self.x), abs(self.y))
 
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __reduce__(self):
+        return self.__class__, (self.x, self.y)
+
     def __eq__(self, other):
+        if not isinstance(other, Position):
+            return NotImplemented
         return self.x == other.x and self.y == other.y
 
-    def __ne__(self, other):
-        return not self.__eq__(other)
+    def __hash__(self):
+        return hash((self.x, self.y))
 
     def __repr__(self):
         return "{}({}, {})".format(self.__class__.__name__,
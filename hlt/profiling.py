@@ -0,0 +1,141 @@
+import atexit
+import json
+import time
+
+import numpy as np
+
+# Spans recorded by the Game itself
+PARSE_SPAN = 'parse'
+USER_SPAN = 'user'
+SEND_SPAN = 'send'
+FALLBACK_SPAN = 'fallback'
+
+
+class _NoSpan:
+    """
+    The span returned when profiling is disabled. A single shared instance that does nothing.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Span:
+    """
+    Times the block it is entered for. Spans entered inside another are named parent/child.
+    """
+    __slots__ = ('_profiler', '_name', '_qualified_name', '_start')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        stack = self._profiler._stack
+        self._qualified_name = stack[-1] + '/' + self._name if stack else self._name
+        stack.append(self._qualified_name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._profiler.record(self._qualified_name, time.perf_counter() - self._start)
+        self._profiler._stack.pop()
+        return False
+
+
+class Profiler:
+    """
+    Records how long named spans of each turn take. Durations are kept in memory, as the turn and
+    microseconds of every span, and written once as a compact JSON trace when the bot exits.
+    """
+    def __init__(self, path=None):
+        """
+        :param path: Where to write the trace on exit, or None to not write it
+        """
+        self.path = path
+        self.turn_number = 0
+        # Span name to the turns and durations in microseconds it was recorded for
+        self._spans = {}
+        self._stack = []
+        if path is not None:
+            atexit.register(self.write)
+
+    def span(self, name):
+        """
+        :param name: The span name
+        :return: A context manager recording the time spent in its block
+        """
+        return _Span(self, name)
+
+    def record(self, name, duration):
+        """
+        Records a span of the current turn.
+        :param name: The span name
+        :param duration: Its duration in seconds
+        :return: nothing.
+        """
+        spans = self._spans.get(name)
+        if spans is None:
+            spans = self._spans[name] = ([], [])
+        spans[0].append(self.turn_number)
+        spans[1].append(int(duration * 1e6))
+
+    def get_durations(self, name):
+        """
+        :param name: The span name
+        :return: A numpy array of the span's durations in seconds
+        """
+        return np.array(self._spans.get(name, ([], []))[1], dtype=np.float64) / 1e6
+
+    def summary(self):
+        """
+        :return: A dict of span name to its count and the total, mean, p50, p99 and max of its durations in seconds
+        """
+        summary = {}
+        for name in self._spans:
+            durations = self.get_durations(name)
+            p50, p99 = np.percentile(durations, [50, 99])
+            summary[name] = {'count': len(durations), 'total': durations.sum(), 'mean': durations.mean(),
+                             'p50': p50, 'p99': p99, 'max': durations.max()}
+        return summary
+
+    def format_summary(self):
+        """
+        :return: The summary as a table with a row per span and times in milliseconds
+        """
+        lines = ['{:<32} {:>6} {:>10} {:>9} {:>9} {:>9}'.format('span', 'count', 'total', 'p50', 'p99', 'max')]
+        for name, stats in sorted(self.summary().items()):
+            lines.append('{:<32} {:>6} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+                name, stats['count'], stats['total'] * 1e3, stats['p50'] * 1e3, stats['p99'] * 1e3,
+                stats['max'] * 1e3))
+        return '\n'.join(lines)
+
+    def write(self, path=None):
+        """
+        Writes the trace as JSON: {"spans": {name: {"turns": [...], "microseconds": [...]}}}
+        :param path: Where to write it, by default the path given when creating the profiler
+        :return: nothing.
+        """
+        path = path or self.path
+        trace = {'spans': {name: {'turns': turns, 'microseconds': durations}
+                           for name, (turns, durations) in self._spans.items()}}
+        with open(path, 'w') as trace_file:
+            json.dump(trace, trace_file, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: The path of a trace written by write
+        :return: A Profiler holding the trace's spans
+        """
+        with open(path) as trace_file:
+            trace = json.load(trace_file)
+        profiler = cls()
+        profiler._spans = {name: (span['turns'], span['microseconds']) for name, span in trace['spans'].items()}
+        return profiler
+
@@ -0,0 +1,198 @@
+import numpy as np
+
+from . import constants
+from .game_map import _get_index_table
+
+
+class BatchSimulator:
+    """
+    Steps many independent games in lockstep for rollouts and training.
+
+    Every game has the same map size, number of players and number of ship slots per player,
+    and its whole state lives in stacked numpy arrays indexed by game first:
+
+    * halite: [game, y, x] halite in the sea
+    * player_halite: [game, player] stored halite
+    * structure_owner: [game, y, x] owner of the shipyard or dropoff on a cell, -1 if none
+    * ship_alive, ship_x, ship_y, ship_halite, ship_inspired: [game, slot] per ship slot.
+      Slot s belongs to player s // max_ships, see ship_owner.
+
+    Turns follow the rules in hlt.constants, which must be loaded first: ships pay the move cost
+    or stay put, spawn on their shipyard, sink when they share a cell (their cargo going to the
+    owner of a structure there, or into the sea), mine when they stay still, deposit on their own
+    structures and are inspired for the next turn by nearby opponents. Dropoffs are not built.
+    """
+    def __init__(self, halite, shipyards, player_halite=0, max_ships=64):
+        """
+        :param halite: The starting halite of each game, indexed as [game, y, x]
+        :param shipyards: The (x, y) shipyard of each player, indexed as [game, player]; or as [player] for every game
+        :param player_halite: The stored halite each player starts with, a scalar or indexed as [game, player]
+        :param max_ships: How many ships each player may have at once
+        """
+        self.halite = np.array(halite, dtype=np.int64, order='C')
+        self.num_games, self.height, self.width = self.halite.shape
+        self.shipyards = np.broadcast_to(np.asarray(shipyards, dtype=np.int64),
+                                         (self.num_games,) + np.shape(shipyards)[-2:]).copy()
+        self.num_players = self.shipyards.shape[1]
+        self.max_ships = max_ships
+        self.player_halite = np.zeros((self.num_games, self.num_players), dtype=np.int64)
+        self.player_halite[:] = player_halite
+
+        self.structure_owner = np.full(self.halite.shape, -1, dtype=np.int64)
+        games = np.arange(self.num_games)[:, None]
+        self.structure_owner[games, self.shipyards[..., 1], self.shipyards[..., 0]] = np.arange(self.num_players)
+
+        num_slots = self.num_players * max_ships
+        self.ship_owner = np.repeat(np.arange(self.num_players), max_ships)
+        self.ship_alive = np.zeros((self.num_games, num_slots), dtype=bool)
+        self.ship_x = np.zeros((self.num_games, num_slots), dtype=np.int64)
+        self.ship_y = np.zeros((self.num_games, num_slots), dtype=np.int64)
+        self.ship_halite = np.zeros((self.num_games, num_slots), dtype=np.int64)
+        self.ship_inspired = np.zeros((self.num_games, num_slots), dtype=bool)
+        # Maps the id of each ship loaded by from_game to its slot
+        self.ship_slots = {}
+        self.turn_number = 0
+        self._games = games
+
+    @classmethod
+    def from_game(cls, game, num_games=1, max_ships=64):
+        """
+        Creates a simulator whose games all start from the current state of a live game.
+        :param game: The hlt Game to copy
+        :param num_games: How many copies to step
+        :param max_ships: How many ships each player may have at once
+        :return: The simulator
+        """
+        players = [game.players[player_id] for player_id in sorted(game.players)]
+        game_map = game.game_map
+        simulator = cls(np.broadcast_to(game_map.halite_grid, (num_games, game_map.height, game_map.width)),
+                        [(player.shipyard.position.x, player.shipyard.position.y) for player in players],
+                        [player.halite_amount for player in players],
+                        max_ships)
+        for index, player in enumerate(players):
+            for dropoff in player.get_dropoffs():
+                simulator.structure_owner[:, dropoff.position.y, dropoff.position.x] = index
+            ships = player.get_ships()
+            if len(ships) > max_ships:
+                raise ValueError("Player {} has more than {} ships.".format(player.id, max_ships))
+            for offset, ship in enumerate(ships):
+                slot = index * max_ships + offset
+                simulator.ship_slots[ship.id] = slot
+                simulator.ship_alive[:, slot] = True
+                simulator.ship_x[:, slot] = ship.position.x
+                simulator.ship_y[:, slot] = ship.position.y
+                simulator.ship_halite[:, slot] = ship.halite_amount
+        if constants.INSPIRATION_ENABLED:
+            simulator._update_inspiration()
+        return simulator
+
+    def _cell_indices(self):
+        """
+        :return: The index of the cell under each ship slot in the flattened halite array, indexed as [game, slot]
+        """
+        return (self._games * self.height + self.ship_y) * self.width + self.ship_x
+
+    def step(self, moves, spawn=None):
+        """
+        Plays one turn of every game.
+        :param moves: The Direction of each ship slot, indexed as [game, slot]; Direction tuples or an
+                      integer array of (dx, dy) with a trailing axis of 2. Empty slots are ignored.
+        :param spawn: Optional booleans indexed as [game, player], whether each player spawns a ship.
+                      Spawns are skipped when the player lacks the halite or a free ship slot.
+        :return: nothing.
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        dx, dy = moves[..., 0], moves[..., 1]
+        alive = self.ship_alive
+        flat_halite = self.halite.reshape(-1)
+
+        # Ships that cannot pay for their move stay still
+        ratio = np.where(self.ship_inspired, constants.INSPIRED_MOVE_COST_RATIO, constants.MOVE_COST_RATIO)
+        cost = flat_halite[self._cell_indices()] // ratio
+        moved = alive & ((dx != 0) | (dy != 0)) & (self.ship_halite >= cost)
+        self.ship_halite -= np.where(moved, cost, 0)
+        self.ship_x = np.where(moved, (self.ship_x + dx) % self.width, self.ship_x)
+        self.ship_y = np.where(moved, (self.ship_y + dy) % self.height, self.ship_y)
+
+        spawned = np.zeros_like(alive)
+        if spawn is not None:
+            free = ~alive.reshape(self.num_games, self.num_players, self.max_ships)
+            spawning = np.asarray(spawn, dtype=bool) & (self.player_halite >= constants.SHIP_COST) & free.any(axis=2)
+            games, players = np.nonzero(spawning)
+            slots = free.argmax(axis=2)[games, players] + players * self.max_ships
+            self.player_halite[games, players] -= constants.SHIP_COST
+            alive[games, slots] = True
+            spawned[games, slots] = True
+            self.ship_x[games, slots] = self.shipyards[games, players, 0]
+            self.ship_y[games, slots] = self.shipyards[games, players, 1]
+            self.ship_halite[games, slots] = 0
+            self.ship_inspired[games, slots] = False
+
+        cells = self._cell_indices()
+        self._resolve_collisions(cells)
+
+        # Ships that stayed still mine; no two ships share a cell any more
+        stayed = alive & ~moved & ~spawned
+        cell_halite = flat_halite[cells]
+        ratio = np.where(self.ship_inspired, constants.INSPIRED_EXTRACT_RATIO, constants.EXTRACT_RATIO)
+        capacity = constants.MAX_HALITE - self.ship_halite
+        extracted = np.where(stayed, np.minimum(-(-cell_halite // ratio), capacity), 0)
+        bonus = np.where(self.ship_inspired,
+                         np.minimum((extracted * constants.INSPIRED_BONUS_MULTIPLIER).astype(np.int64),
+                                    capacity - extracted),
+                         0)
+        flat_halite[cells[stayed]] -= extracted[stayed]
+        self.ship_halite += extracted + bonus
+
+        owners = np.broadcast_to(self.ship_owner, alive.shape)
+        depositing = alive & (self.structure_owner.reshape(-1)[cells] == owners)
+        np.add.at(self.player_halite, (np.nonzero(depositing)[0], owners[depositing]), self.ship_halite[depositing])
+        self.ship_halite[depositing] = 0
+
+        self._update_inspiration()
+        self.turn_number += 1
+
+    def _resolve_collisions(self, cells):
+        """
+        Sinks every ship sharing a cell with another, moving its cargo to the owner of a structure on the
+        cell, or into the sea otherwise.
+        :param cells: The flattened cell index under each ship slot
+        :return: nothing.
+        """
+        alive = self.ship_alive
+        counts = np.bincount(cells[alive], minlength=self.halite.size)
+        collided = alive & (counts[cells] > 1)
+        if not collided.any():
+            return
+        wreck_cells = cells[collided]
+        cargo = self.ship_halite[collided]
+        owners = self.structure_owner.reshape(-1)[wreck_cells]
+        on_structure = owners >= 0
+        np.add.at(self.halite.reshape(-1), wreck_cells[~on_structure], cargo[~on_structure])
+        np.add.at(self.player_halite,
+                  (wreck_cells[on_structure] // (self.height * self.width), owners[on_structure]),
+                  cargo[on_structure])
+        alive &= ~collided
+        self.ship_halite[collided] = 0
+
+    def _update_inspiration(self):
+        """
+        Marks the ships with enough opponent ships within the inspiration radius as inspired.
+        :return: nothing.
+        """
+        if not constants.INSPIRATION_ENABLED:
+            self.ship_inspired[:] = False
+            return
+        alive = self.ship_alive
+        games, slots = np.nonzero(alive)
+        owners = self.ship_owner[slots]
+        map_cells = self.ship_y[alive] * self.width + self.ship_x[alive]
+        # Owner of the ship on each cell; after collisions no two ships share a cell
+        map_offsets = games * (self.height * self.width)
+        cell_owners = np.full(self.halite.size, -1, dtype=np.int8)
+        cell_owners[map_offsets + map_cells] = owners
+        nearby = _get_index_table(self.width, self.height, constants.INSPIRATION_RADIUS, True)[map_cells]
+        nearby_owners = cell_owners[nearby + map_offsets[:, None]]
+        opponents = np.count_nonzero((nearby_owners >= 0) & (nearby_owners != owners[:, None]), axis=1)
+        self.ship_inspired = np.zeros_like(alive)
+        self.ship_inspired[games, slots] = opponents >= constants.INSPIRATION_SHIP_COUNT
@@ -0,0 +1,213 @@
+import collections
+import math
+
+import numpy as np
+
+from . import constants
+from .game_map import _get_index_table
+from .positionals import Direction, Position
+
+# A ship in a snapshot. Immutable, so branches of a snapshot can share them.
+ShipState = collections.namedtuple('ShipState', ['owner', 'id', 'position', 'halite_amount', 'inspired'])
+
+
+class Snapshot:
+    """
+    A compact copy of the game state for lookahead search: halite, stored halite, ships and structures,
+    without any MapCell, Ship or Player objects.
+
+    Snapshots are copy-on-write. The halite grid they start from is shared and never written; cells a
+    snapshot changes go to a small overlay instead. branch() therefore only copies the overlay and the
+    ship and halite dicts, so a search tree can branch at every node without copying the map.
+    """
+    def __init__(self, width, height, halite, shipyards, structures, ships, player_halite, turn_number,
+                 positions=None):
+        """
+        :param width: The map width
+        :param height: The map height
+        :param halite: The flattened halite grid, indexed as y * width + x. Shared and never written.
+        :param shipyards: The shipyard position of each player id
+        :param structures: The owner of each structure position. Shared and never written.
+        :param ships: Dict of ship id to ShipState
+        :param player_halite: Dict of player id to stored halite
+        :param turn_number: The turn the state is for
+        :param positions: Optional pool of the map's positions, indexed as [y][x], shared with the GameMap
+        """
+        self.width = width
+        self.height = height
+        self.shipyards = shipyards
+        self.structures = structures
+        self.ships = ships
+        self.player_halite = player_halite
+        self.turn_number = turn_number
+        self._halite = halite
+        self._overlay = {}
+        if positions is None:
+            positions = [[Position(x, y) for x in range(width)] for y in range(height)]
+        self._positions = positions
+        # Ships spawned in a snapshot get negative ids so they never clash with the engine's
+        self._next_ship_id = -1
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        Takes a snapshot of the current state of a game.
+        :param game: The hlt Game
+        :return: The snapshot
+        """
+        structures = {}
+        ships = {}
+        for player in game.players.values():
+            structures[player.shipyard.position] = player.id
+            for dropoff in player.get_dropoffs():
+                structures[dropoff.position] = player.id
+            for ship in player.get_ships():
+                ships[ship.id] = ShipState(player.id, ship.id, ship.position, ship.halite_amount, False)
+        game_map = game.game_map
+        snapshot = cls(game_map.width, game_map.height, game_map.halite_grid.ravel().copy(),
+                       {player.id: player.shipyard.position for player in game.players.values()},
+                       structures, ships,
+                       {player.id: player.halite_amount for player in game.players.values()},
+                       game.turn_number, game_map._positions)
+        snapshot._update_inspiration()
+        return snapshot
+
+    def branch(self):
+        """
+        :return: A copy of this snapshot that can be changed without affecting it
+        """
+        child = Snapshot(self.width, self.height, self._halite, self.shipyards, self.structures,
+                         dict(self.ships), dict(self.player_halite), self.turn_number, self._positions)
+        child._overlay = dict(self._overlay)
+        child._next_ship_id = self._next_ship_id
+        return child
+
+    def _get_halite(self, index):
+        halite = self._overlay.get(index)
+        return int(self._halite[index]) if halite is None else halite
+
+    def get_halite(self, position):
+        """
+        :param position: A position, normalized or not
+        :return: The halite in the sea at that position
+        """
+        return self._get_halite(position.y % self.height * self.width + position.x % self.width)
+
+    @property
+    def halite_grid(self):
+        """
+        :return: A new 2-D numpy array of the halite in the sea, indexed as [y, x]
+        """
+        halite = self._halite.copy()
+        if self._overlay:
+            halite[list(self._overlay)] = list(self._overlay.values())
+        return halite.reshape(self.height, self.width)
+
+    def get_ships(self, player_id):
+        """
+        :param player_id: The player's id
+        :return: A list of the player's ShipStates
+        """
+        return [ship for ship in self.ships.values() if ship.owner == player_id]
+
+    def apply(self, moves, spawns=()):
+        """
+        Plays one turn on this snapshot, following the game rules: ships pay the move cost or stay put,
+        spawn on their shipyard, sink when they share a cell, mine when they stay still, deposit on their
+        own structures and are inspired for the next turn by nearby opponents. Dropoffs are not built.
+        :param moves: Dict of ship id to the Direction to move in; ships left out stay still
+        :param spawns: The ids of the players that spawn a ship, if they can afford it
+        :return: nothing.
+        """
+        width, height = self.width, self.height
+        ships = {}
+        still = set()
+        # Ship ids by the index of the cell they end up on
+        occupants = {}
+        for ship in self.ships.values():
+            position = ship.position
+            index = position.y * width + position.x
+            halite = ship.halite_amount
+            direction = moves.get(ship.id, Direction.Still)
+            if direction != Direction.Still:
+                ratio = constants.INSPIRED_MOVE_COST_RATIO if ship.inspired else constants.MOVE_COST_RATIO
+                cost = self._get_halite(index) // ratio
+                # Ships that cannot pay for their move stay still
+                if halite >= cost:
+                    halite -= cost
+                    x, y = (position.x + direction[0]) % width, (position.y + direction[1]) % height
+                    index = y * width + x
+                    position = self._positions[y][x]
+            if index not in occupants:
+                occupants[index] = [ship.id]
+            else:
+                occupants[index].append(ship.id)
+            if position is ship.position:
+                still.add(ship.id)
+            ships[ship.id] = ShipState(ship.owner, ship.id, position, halite, ship.inspired)
+
+        for player_id in spawns:
+            if self.player_halite[player_id] >= constants.SHIP_COST:
+                self.player_halite[player_id] -= constants.SHIP_COST
+                ship_id = self._next_ship_id
+                position = self.shipyards[player_id]
+                ships[ship_id] = ShipState(player_id, ship_id, position, 0, False)
+                occupants.setdefault(position.y * width + position.x, []).append(ship_id)
+                self._next_ship_id -= 1
+
+        for index, ship_ids in occupants.items():
+            if len(ship_ids) < 2:
+                continue
+            cargo = sum(ships.pop(ship_id).halite_amount for ship_id in ship_ids)
+            owner = self.structures.get(self._positions[index // width][index % width])
+            if owner is None:
+                self._overlay[index] = self._get_halite(index) + cargo
+            else:
+                self.player_halite[owner] += cargo
+
+        for ship in ships.values():
+            halite = ship.halite_amount
+            if ship.id in still:
+                index = ship.position.y * self.width + ship.position.x
+                cell_halite = self._get_halite(index)
+                ratio = constants.INSPIRED_EXTRACT_RATIO if ship.inspired else constants.EXTRACT_RATIO
+                capacity = constants.MAX_HALITE - halite
+                extracted = min(int(math.ceil(cell_halite / ratio)), capacity)
+                bonus = 0
+                if ship.inspired:
+                    bonus = min(int(extracted * constants.INSPIRED_BONUS_MULTIPLIER), capacity - extracted)
+                if extracted:
+                    self._overlay[index] = cell_halite - extracted
+                halite += extracted + bonus
+            if halite and self.structures.get(ship.position) == ship.owner:
+                self.player_halite[ship.owner] += halite
+                halite = 0
+            if halite != ship.halite_amount:
+                ships[ship.id] = ShipState(ship.owner, ship.id, ship.position, halite, ship.inspired)
+
+        self.ships = ships
+        self.turn_number += 1
+        self._update_inspiration()
+
+    def _update_inspiration(self):
+        """
+        Marks the ships with enough opponent ships within the inspiration radius as inspired.
+        :return: nothing.
+        """
+        if not self.ships:
+            return
+        if not constants.INSPIRATION_ENABLED:
+            self.ships = {ship_id: ship._replace(inspired=False) for ship_id, ship in self.ships.items()}
+            return
+        ships = list(self.ships.values())
+        cells = np.array([ship.position.y * self.width + ship.position.x for ship in ships])
+        owners = np.array([ship.owner for ship in ships])
+        cell_owners = np.full(self.width * self.height, -1, dtype=np.int64)
+        cell_owners[cells] = owners
+        nearby = _get_index_table(self.width, self.height, constants.INSPIRATION_RADIUS, True)[cells]
+        nearby_owners = cell_owners[nearby]
+        opponents = np.count_nonzero((nearby_owners >= 0) & (nearby_owners != owners[:, None]), axis=1)
+        inspired = (opponents >= constants.INSPIRATION_SHIP_COUNT).tolist()
+        self.ships = {ship.id: ship if ship.inspired == is_inspired
+                      else ShipState(ship.owner, ship.id, ship.position, ship.halite_amount, is_inspired)
+                      for ship, is_inspired in zip(ships, inspired)}
@@ -0,0 +1,68 @@
+"""
+Simulates gym evaluation to compare matchmaking modes: how many games each needs before every bot's sigma
+is at or below a target, and how long picking a match takes.
+
+Bots get true skills drawn from N(25, 8) and each game is decided by skill + N(0, beta) performances,
+rated with the same trueskill setup as the gym.
+
+    python benchmarks/matchmaking.py --bots 8 --target 2.0 --seeds 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import trueskill
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hlt_client import gym  # noqa: E402
+
+MAX_GAMES = 5000
+
+
+def simulate(matchmaking, num_bots, target, seed):
+    """
+    :return: The number of games played until every sigma is at or below target, and the seconds spent picking
+    """
+    random.seed(seed)
+    skills = [random.gauss(gym.BASE_MU, 8) for _ in range(num_bots)]
+    bots = {bot_id: {'id': bot_id, 'mu': gym.BASE_MU, 'sigma': gym.BASE_SIGMA} for bot_id in range(num_bots)}
+    beta = trueskill.global_env().beta
+    games = 0
+    picking = 0.0
+    while max(bot['sigma'] for bot in bots.values()) > target and games < MAX_GAMES:
+        started = time.perf_counter()
+        players = gym._choose_bots(bots.values(), matchmaking)
+        picking += time.perf_counter() - started
+        performances = {bot['id']: random.gauss(skills[bot['id']], beta) for bot in players}
+        order = sorted(players, reverse=True, key=lambda bot: performances[bot['id']])
+        new_ratings = trueskill.rate([[trueskill.Rating(mu=bots[bot['id']]['mu'], sigma=bots[bot['id']]['sigma'])]
+                                      for bot in order])
+        for bot, rating in zip(order, new_ratings):
+            bots[bot['id']]['mu'], bots[bot['id']]['sigma'] = rating[0].mu, rating[0].sigma
+        games += 1
+    return games, picking
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bots', type=int, default=8)
+    parser.add_argument('--target', type=float, default=2.0)
+    parser.add_argument('--seeds', type=int, default=10)
+    args = parser.parse_args()
+
+    trueskill.setup(tau=0.008, draw_probability=0.001)
+    print('{:>12} {:>11} {:>13} {:>13}'.format('matchmaking', 'mean games', 'median games', 'ms per pick'))
+    for matchmaking in gym.MATCHMAKING_MODES:
+        results = [simulate(matchmaking, args.bots, args.target, seed) for seed in range(args.seeds)]
+        games = [result[0] for result in results]
+        pick_ms = 1000 * sum(result[1] for result in results) / sum(games)
+        print('{:>12} {:>11.1f} {:>13.1f} {:>13.2f}'.format(matchmaking, statistics.mean(games),
+                                                             statistics.median(games), pick_ms))
+
+
+if __name__ == '__main__':
+    main()
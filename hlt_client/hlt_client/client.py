@@ -9,6 +9,7 @@ import argparse
 from . import output
 from . import upload_bot
 from . import download_game
+from . import replay_store
 from . import compare_bots
 from . import gym
 
@@ -46,6 +47,7 @@ BOT_DOWNLOAD_MODE = 'download'
 MODES = str({AUTH_MODE, GYM_MODE, PLAY_MODE, REPLAY_MODE, BOT_MODE})
 REPLAY_MODE_DATE = 'date'
 REPLAY_MODE_USER = 'user'
+REPLAY_MODE_CONVERT = 'convert'
 
 
 class Config:
@@ -183,7 +185,7 @@ def _parse_arguments():
     # .Modes.Replay
     replay_parser = subparser.add_parser('replay', help='Actions associated with replay files')
     # .Modes.Replay.Modes
-    replay_subparser = replay_parser.add_subparsers(dest='replay_mode', metavar='{date, user}')
+    replay_subparser = replay_parser.add_subparsers(dest='replay_mode', metavar='{date, user, convert}')
     # .Modes.Replay.Modes.User
     replay_user_parser = replay_subparser.add_parser(REPLAY_MODE_USER, help='Retrieve replays based on a specified user')
     replay_user_parser.add_argument('--decompress', action='store_true', dest='decompress',
@@ -207,6 +209,13 @@ def _parse_arguments():
                                      help="Whether to retrieve all files. Omit for only Gold and higher.")
     replay_regex_parser.add_argument('-d', '--destination', dest='destination', action='store', type=str, required=True,
                                      help="In which folder to store all resulting replay files.")
+    # .Modes.Replay.Modes.Convert
+    replay_convert_parser = replay_subparser.add_parser(REPLAY_MODE_CONVERT,
+                                                        help='Convert replays into a memory-mapped replay store')
+    replay_convert_parser.add_argument('-d', '--destination', dest='destination', action='store', type=str,
+                                       required=True, help="The replay store folder, created if needed.")
+    replay_convert_parser.add_argument('replays', nargs='+',
+                                       help="Replay files, or folders of replay files, to convert.")
     # .Modes.Gym
     gym.parse_arguments(subparser)
     if len(sys.argv) < 2:
@@ -258,7 +267,10 @@ def main():
                 upload_bot.download(args.bot_path)
         elif args.mode == REPLAY_MODE:
             if not args.replay_mode:
-                raise ValueError("Provide a download mode (date or user)")
+                raise ValueError("Provide a replay mode (date, user or convert)")
+            if args.replay_mode == REPLAY_MODE_CONVERT:
+                replay_store.convert(args.destination, args.replays)
+                return
             download_game.download(args.replay_mode, args.destination,
                                    getattr(args, 'date', None), getattr(args, 'all', None),
                                    Config().user_id if Config.auth_exists() else None, getattr(args, 'user_id', None),
@@ -267,7 +279,8 @@ def main():
             compare_bots.play_games(args.halite_binary,
                                     args.game_output_dir,
                                     args.map_width, args.map_height,
-                                    args.run_commands, args.iterations, [])
+                                    args.run_commands, args.iterations, [], args.parallel,
+                                    (args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None)
         elif args.mode == GYM_MODE:
             gym.main(args)
     except (IndexError, TypeError, ValueError, IOError) as err:
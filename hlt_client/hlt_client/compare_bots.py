@@ -1,12 +1,25 @@
+import concurrent.futures
 import json
+import math
 import os
 import subprocess
 
-from . import output
+from . import engine, output
 
 _SPACE_DELIMITER = ' '
 _BOT_ID_POSITION = 1
 
+# Default hypotheses and error rates of the sequential probability ratio test
+DEFAULT_ELO0 = 0.0
+DEFAULT_ELO1 = 50.0
+DEFAULT_ALPHA = 0.05
+DEFAULT_BETA = 0.05
+# z-score of the reported two-sided 95% confidence interval
+_CONFIDENCE_Z = 1.959964
+# Win rates this close to 0 or 1 are treated as 0 or 1, as the Wilson bounds of a clean sweep only reach them
+# up to rounding
+_SCORE_TOLERANCE = 1e-12
+
 
 def _determine_winner(results):
     """
@@ -19,13 +32,57 @@ def _determine_winner(results):
             return player_id
 
 
+def _win_probability(elo):
+    """
+    :param elo: An Elo difference
+    :return: The probability that a bot that much stronger wins a game
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def _elo(score):
+    """
+    :param score: A win rate
+    :return: The Elo difference it corresponds to, infinite for 0 or 1
+    """
+    if score <= _SCORE_TOLERANCE or score >= 1 - _SCORE_TOLERANCE:
+        return math.copysign(math.inf, score - 0.5)
+    return -400 * math.log10(1 / score - 1)
+
+
+def _elo_interval(wins, games):
+    """
+    :return: The Elo difference estimated from wins out of games, and its 95% confidence interval
+             computed from the Wilson score interval of the win rate
+    """
+    score = wins / games
+    z2 = _CONFIDENCE_Z ** 2
+    centre = (score + z2 / (2 * games)) / (1 + z2 / games)
+    margin = _CONFIDENCE_Z * math.sqrt(score * (1 - score) / games + z2 / (4 * games ** 2)) / (1 + z2 / games)
+    return _elo(score), _elo(centre - margin), _elo(centre + margin)
+
+
+def _sprt(wins, losses, elo0, elo1, alpha, beta):
+    """
+    Sequential probability ratio test of H0: the first bot is elo0 stronger, against H1: it is elo1 stronger.
+    Halite games have no draws, so each game is a Bernoulli trial.
+    :return: The log-likelihood ratio of the games so far, and its lower and upper stopping bounds.
+             The test accepts H0 when the ratio falls to the lower bound and H1 when it reaches the upper one.
+    """
+    p0, p1 = _win_probability(elo0), _win_probability(elo1)
+    llr = wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+    return llr, math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
 def _play_game(binary, bot_commands, flags):
     """
     Plays one game considering the specified bots and the game and map constraints.
-    :param binary: The halite binary
+    :param binary: The halite binary, or engine.BUILTIN_ENGINE to play with the builtin engine
     :param bot_commands: The commands to run each of the bots
     :return: The game's result string
     """
+    if binary == engine.BUILTIN_ENGINE:
+        return json.dumps(engine.run(flags + list(bot_commands)))
     command = [
         binary,
         "--results-as-json"
@@ -36,19 +93,63 @@ def _play_game(binary, bot_commands, flags):
     return subprocess.check_output(command).decode()
 
 
-def play_games(binary, game_output_dir, map_width, map_height, bot_commands, number_of_runs, flags):
+def _game_flags(flags, game_output_dir, game_number, parallel):
+    """
+    :return: The engine flags of one game. Concurrent games each write to their own subdirectory of the output directory.
+    """
+    if game_output_dir is None:
+        return flags
+    if parallel > 1:
+        game_output_dir = os.path.join(game_output_dir, 'game-{}'.format(game_number))
+        os.makedirs(game_output_dir, exist_ok=True)
+    return flags + ['-i', game_output_dir]
+
+
+def _play_games(binary, bot_commands, flags, game_output_dir, number_of_runs, parallel):
+    """
+    Plays games, up to parallel at a time.
+    :return: A generator of the result strings of the games, in the order they finish
+    """
+    if parallel <= 1:
+        for game_number in range(number_of_runs):
+            yield _play_game(binary, bot_commands, _game_flags(flags, game_output_dir, game_number, parallel))
+        return
+    # The builtin engine runs the game loop in Python, so it needs processes to use more than one core;
+    # the Halite binary only needs a thread to wait on it.
+    if binary == engine.BUILTIN_ENGINE:
+        executor = concurrent.futures.ProcessPoolExecutor(parallel)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(parallel)
+    with executor:
+        games = [executor.submit(_play_game, binary, bot_commands,
+                                 _game_flags(flags, game_output_dir, game_number, parallel))
+                 for game_number in range(number_of_runs)]
+        try:
+            for game in concurrent.futures.as_completed(games):
+                yield game.result()
+        finally:
+            for game in games:
+                game.cancel()
+
+
+def play_games(binary, game_output_dir, map_width, map_height, bot_commands, number_of_runs, flags, parallel=1,
+               sprt=None):
     """
     Runs number_of_runs games using the designated bots and binary, recording the tally of wins per player
-    :param binary: The Halite binary.
-    :param game_output_dir: Where to put replays and log files.
+    :param binary: The Halite binary, or engine.BUILTIN_ENGINE to play with the builtin engine.
+    :param game_output_dir: Where to put replays and log files. Games played in parallel each get a game-<n> subdirectory.
     :param map_width: The map width, set to None for engine random choice
     :param map_height: The map height, set to None for engine random choice
     :param bot_commands: The commands to run each of the bots (must be either 2 or 4)
     :param number_of_runs: How many runs total
+    :param parallel: How many games to play at once
+    :param sprt: Optional (elo0, elo1, alpha, beta) to stop as soon as a sequential probability ratio test decides
+                 whether the first of two bots is elo0 or elo1 Elo stronger than the second
     :return: Nothing
     """
 
-    binary = os.path.abspath(binary)
+    if binary != engine.BUILTIN_ENGINE:
+        binary = os.path.abspath(binary)
 
     if game_output_dir is not None:
         game_output_dir = os.path.abspath(game_output_dir)
@@ -58,8 +159,6 @@ def play_games(binary, game_output_dir, map_width, map_height, bot_commands, num
             except FileExistsError:
                 pass
 
-        flags = flags + ['-i', game_output_dir]
-
     if map_width is not None:
         flags.extend(["--width", str(map_width)])
     if map_height is not None:
@@ -69,13 +168,53 @@ def play_games(binary, game_output_dir, map_width, map_height, bot_commands, num
     result = {}
     if not(len(bot_commands) == 4 or len(bot_commands) == 2):
         raise IndexError("The number of bots specified must be either 2 or 4.")
-    for current_run in range(0, number_of_runs):
-        match_output = _play_game(binary, bot_commands, flags)
-        results = json.loads(match_output)
-        winner = _determine_winner(results)
-        result[winner] = result.setdefault(winner, 0) + 1
-        output.output("Finished {} runs.".format(current_run + 1), games_played=current_run + 1)
-        output.output("Win Ratio: {}".format(result), stats=result, results=results)
+    if sprt is not None and len(bot_commands) != 2:
+        raise IndexError("Sequential testing compares exactly 2 bots.")
+    games = _play_games(binary, bot_commands, flags, game_output_dir, number_of_runs, parallel)
+    try:
+        for current_run, match_output in enumerate(games):
+            results = json.loads(match_output)
+            winner = _determine_winner(results)
+            result[winner] = result.setdefault(winner, 0) + 1
+            output.output("Finished {} runs.".format(current_run + 1), games_played=current_run + 1)
+            output.output("Win Ratio: {}".format(result), stats=result, results=results)
+            if sprt is not None and _report_sprt(result.get('0', 0), current_run + 1, *sprt):
+                break
+    finally:
+        games.close()
+
+
+def _report_sprt(wins, games, elo0, elo1, alpha, beta):
+    """
+    Reports the sequential test of the first bot against the second after a game, and its Elo confidence interval.
+    :param wins: The first bot's wins so far
+    :param games: The games played so far
+    :return: Whether the test is decided
+    """
+    llr, lower, upper = _sprt(wins, games - wins, elo0, elo1, alpha, beta)
+    elo, elo_low, elo_high = _elo_interval(wins, games)
+    if llr >= upper:
+        decision = 'H1'
+        message = "Stopping after {} runs: bot 0 is at least {:+g} Elo stronger (H1 accepted).".format(games, elo1)
+    elif llr <= lower:
+        decision = 'H0'
+        message = "Stopping after {} runs: bot 0 is at most {:+g} Elo stronger (H0 accepted).".format(games, elo0)
+    else:
+        decision = None
+        message = "SPRT undecided"
+    output.output("{} LLR {:.2f} [{:.2f}, {:.2f}], Elo {:+.1f} (95% CI {:+.1f} to {:+.1f})".format(
+                      message, llr, lower, upper, elo, elo_low, elo_high),
+                  sprt={'decision': decision, 'llr': llr, 'lower_bound': lower, 'upper_bound': upper,
+                        'elo0': elo0, 'elo1': elo1, 'alpha': alpha, 'beta': beta},
+                  elo=_finite(elo), elo_interval=[_finite(elo_low), _finite(elo_high)])
+    return decision is not None
+
+
+def _finite(value):
+    """
+    :return: The value, or None if it is infinite, as JSON has no infinity
+    """
+    return value if math.isfinite(value) else None
 
 
 def parse_arguments(subparser):
@@ -89,7 +228,8 @@ def parse_arguments(subparser):
                             dest='halite_binary',
                             action='store',
                             type=str, required=True,
-                            help="The halite game engine path, used to run the games. Included in starter kits/from the download page.")
+                            help="The halite game engine path, used to run the games. Included in starter kits/from the download page. "
+                                 "Pass '{}' to use the pure-Python engine bundled with the client.".format(engine.BUILTIN_ENGINE))
 
     bot_parser.add_argument('--output-dir',
                             dest='game_output_dir',
@@ -112,3 +252,23 @@ def parse_arguments(subparser):
                             action='store',
                             type=int,  default=100,
                             help="Number of games to be run")
+    bot_parser.add_argument('-p', '--parallel',
+                            dest='parallel',
+                            action='store',
+                            type=int, default=1,
+                            help="Number of games to run at once. With --output-dir, each game writes to its own "
+                                 "game-<n> subdirectory")
+    bot_parser.add_argument('--sprt',
+                            dest='sprt',
+                            action='store_true',
+                            help="Stop as soon as a sequential probability ratio test decides between H0: the first "
+                                 "bot is ELO0 stronger, and H1: it is ELO1 stronger. Only for 2 bots; --iterations "
+                                 "becomes the maximum number of games")
+    bot_parser.add_argument('--elo0', dest='elo0', action='store', type=float, default=DEFAULT_ELO0,
+                            help="The Elo difference of H0 (default {})".format(DEFAULT_ELO0))
+    bot_parser.add_argument('--elo1', dest='elo1', action='store', type=float, default=DEFAULT_ELO1,
+                            help="The Elo difference of H1 (default {})".format(DEFAULT_ELO1))
+    bot_parser.add_argument('--alpha', dest='alpha', action='store', type=float, default=DEFAULT_ALPHA,
+                            help="The probability of accepting H1 when H0 holds (default {})".format(DEFAULT_ALPHA))
+    bot_parser.add_argument('--beta', dest='beta', action='store', type=float, default=DEFAULT_BETA,
+                            help="The probability of accepting H0 when H1 holds (default {})".format(DEFAULT_BETA))
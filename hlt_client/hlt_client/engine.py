@@ -0,0 +1,778 @@
+"""
+A pure-Python implementation of the Halite III rules, for playing local games without the halite binary.
+
+Bots run as subprocesses and talk to the engine over the same stdin/stdout protocol as the official
+engine. The command line takes the binary's most common flags and prints the same results JSON:
+
+    python3 -m hlt_client.engine --width 32 --height 32 --results-as-json "python3 MyBot.py" "python3 MyBot.py"
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import queue
+import random
+import subprocess
+import threading
+import time
+
+import zstd
+
+# Pass this instead of a binary path to play games with this engine
+BUILTIN_ENGINE = 'builtin'
+
+ENGINE_VERSION = 'hlt_client-builtin'
+REPLAY_FILE_VERSION = 3
+MAP_GENERATOR = 'fractal'
+
+MAP_SIZES = (32, 40, 48, 56, 64)
+PLAYER_COUNTS = (1, 2, 4)
+
+# Seconds a bot has to send its name, and to send its commands each turn
+INIT_TIMEOUT = 30.0
+TURN_TIMEOUT = 2.0
+# Seconds a bot has to exit after the game ends before it is killed
+SHUTDOWN_TIMEOUT = 1.0
+
+# The constants sent to the bots, as consumed by hlt.constants.load_constants.
+# MAX_TURNS is replaced per game, interpolated between MIN_TURNS and MAX_TURNS by map size.
+DEFAULT_CONSTANTS = {
+    'CAPTURE_ENABLED': False,
+    'CAPTURE_RADIUS': 3,
+    'DEFAULT_MAP_HEIGHT': 48,
+    'DEFAULT_MAP_WIDTH': 48,
+    'DROPOFF_COST': 4000,
+    'DROPOFF_PENALTY_RATIO': 4,
+    'EXTRACT_RATIO': 4,
+    'FACTOR_EXP_1': 2.0,
+    'FACTOR_EXP_2': 2.0,
+    'INITIAL_ENERGY': 5000,
+    'INSPIRATION_ENABLED': True,
+    'INSPIRATION_RADIUS': 4,
+    'INSPIRATION_SHIP_COUNT': 2,
+    'INSPIRED_BONUS_MULTIPLIER': 2.0,
+    'INSPIRED_EXTRACT_RATIO': 4,
+    'INSPIRED_MOVE_COST_RATIO': 10,
+    'MAX_CELL_PRODUCTION': 1000,
+    'MAX_ENERGY': 1000,
+    'MAX_PLAYERS': 16,
+    'MAX_TURNS': 500,
+    'MAX_TURN_THRESHOLD': 64,
+    'MIN_CELL_PRODUCTION': 900,
+    'MIN_TURNS': 400,
+    'MIN_TURN_THRESHOLD': 32,
+    'MOVE_COST_RATIO': 10,
+    'NEW_ENTITY_ENERGY_COST': 1000,
+    'PERSISTENCE': 0.7,
+    'SHIPS_ABOVE_FOR_CAPTURE': 3,
+    'STRICT_ERRORS': False,
+}
+
+_SPAWN = 'g'
+_CONSTRUCT = 'c'
+_MOVE = 'm'
+_STILL = 'o'
+_DIRECTIONS = {'n': (0, -1), 's': (0, 1), 'e': (1, 0), 'w': (-1, 0), _STILL: (0, 0)}
+
+
+class BotError(Exception):
+    """Raised when a bot crashes, times out or sends an invalid command. The bot is then kicked from the game."""
+
+
+def game_constants(width, height, seed, overrides=None):
+    """
+    Builds the constants of a game, with the turn limit for its map size.
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed
+    :param overrides: Optional dict of constants replacing the defaults
+    :return: The constants dict sent to the bots
+    """
+    constants = dict(DEFAULT_CONSTANTS)
+    constants.update(overrides or {})
+    size = max(width, height)
+    min_turns, max_turns = constants['MIN_TURNS'], constants['MAX_TURNS']
+    min_size, max_size = constants['MIN_TURN_THRESHOLD'], constants['MAX_TURN_THRESHOLD']
+    size = min(max(size, min_size), max_size)
+    constants['MAX_TURNS'] = min_turns + (size - min_size) * (max_turns - min_turns) // (max_size - min_size)
+    constants['game_seed'] = seed
+    return constants
+
+
+def _generate_tile(width, height, rng, constants):
+    """
+    Generates one tile of halite as octaves of smoothed noise, skewed so most cells are poor and a few are rich.
+    :return: The halite of the tile, as a list of rows
+    """
+    noise = [[0.0] * width for _ in range(height)]
+    amplitude = 1.0
+    lattice_size = 2
+    while lattice_size <= 2 * max(width, height):
+        lattice = [[rng.random() for _ in range(lattice_size + 1)] for _ in range(lattice_size + 1)]
+        for y in range(height):
+            lattice_y = y * lattice_size / height
+            row, dy = int(lattice_y), lattice_y - int(lattice_y)
+            for x in range(width):
+                lattice_x = x * lattice_size / width
+                column, dx = int(lattice_x), lattice_x - int(lattice_x)
+                top = lattice[row][column] * (1 - dx) + lattice[row][column + 1] * dx
+                bottom = lattice[row + 1][column] * (1 - dx) + lattice[row + 1][column + 1] * dx
+                noise[y][x] += amplitude * (top * (1 - dy) + bottom * dy)
+        amplitude *= constants['PERSISTENCE']
+        lattice_size *= 2
+
+    low = min(min(row) for row in noise)
+    high = max(max(row) for row in noise)
+    peak = rng.randint(constants['MIN_CELL_PRODUCTION'], constants['MAX_CELL_PRODUCTION'])
+    return [[int(peak * ((value - low) / (high - low or 1)) ** constants['FACTOR_EXP_1']) for value in row] for row in noise]
+
+
+def generate_map(width, height, num_players, seed, constants):
+    """
+    Generates a map that is symmetric between players, by mirroring one tile of halite per player.
+    :param width: The map width
+    :param height: The map height
+    :param num_players: 1, 2 or 4
+    :param seed: The map seed
+    :param constants: The game constants
+    :return: The halite grid as a list of rows, and the (x, y) shipyard location of each player
+    """
+    if num_players not in PLAYER_COUNTS:
+        raise ValueError("The number of bots must be one of {}.".format(PLAYER_COUNTS))
+    rng = random.Random(seed)
+    columns = 1 if num_players == 1 else 2
+    rows = 2 if num_players == 4 else 1
+    tile_width, tile_height = (width + columns - 1) // columns, (height + rows - 1) // rows
+    tile = _generate_tile(tile_width, tile_height, rng, constants)
+
+    grid = []
+    for y in range(height):
+        tile_row = tile[min(y, height - 1 - y) if rows == 2 else y]
+        grid.append([tile_row[min(x, width - 1 - x) if columns == 2 else x] for x in range(width)])
+
+    factories = []
+    for row in range(rows):
+        for column in range(columns):
+            x, y = tile_width // 2, tile_height // 2
+            factories.append((width - 1 - x if column else x, height - 1 - y if row else y))
+    for x, y in factories:
+        grid[y][x] = 0
+    return grid, factories
+
+
+class _Bot:
+    """A bot subprocess, with its output read on background threads so reads can time out."""
+    def __init__(self, command):
+        self.process = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._lines = queue.Queue()
+        self._errors = []
+        threading.Thread(target=self._read_output, daemon=True).start()
+        threading.Thread(target=self._read_errors, daemon=True).start()
+
+    def _read_output(self):
+        for line in iter(self.process.stdout.readline, b''):
+            self._lines.put(line.decode(errors='replace').rstrip('\r\n'))
+        self._lines.put(None)
+
+    def _read_errors(self):
+        for line in iter(self.process.stderr.readline, b''):
+            self._errors.append(line.decode(errors='replace'))
+
+    @property
+    def stderr(self):
+        """
+        :return: Everything the bot has written to stderr so far
+        """
+        return ''.join(self._errors)
+
+    def send(self, text):
+        """
+        Writes text to the bot's stdin.
+        :param text: The text to send
+        :return: nothing.
+        """
+        try:
+            self.process.stdin.write(text.encode())
+            self.process.stdin.flush()
+        except OSError:
+            raise BotError("Bot closed its input.")
+
+    def receive(self, deadline):
+        """
+        Reads a line from the bot's stdout.
+        :param deadline: The time.perf_counter() time by which the line must arrive, or None to wait forever
+        :return: The line, without its line ending
+        """
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise BotError("Bot timed out.")
+        if line is None:
+            raise BotError("Bot exited (return code {}).".format(self.process.poll()))
+        return line
+
+    def close(self):
+        """
+        Closes the bot's input, which tells bots using the starter kit to exit, and kills it if it does not.
+        :return: nothing.
+        """
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class _Ship:
+    __slots__ = ('id', 'owner', 'x', 'y', 'halite', 'inspired')
+
+    def __init__(self, ship_id, owner, x, y):
+        self.id = ship_id
+        self.owner = owner
+        self.x = x
+        self.y = y
+        self.halite = 0
+        self.inspired = False
+
+
+class _Player:
+    def __init__(self, player_id, command, factory, halite):
+        self.id = player_id
+        self.command = command
+        self.name = command
+        self.bot = None
+        self.factory = factory
+        self.halite = halite
+        self.ships = {}
+        self.dropoffs = {}
+        self.halite_history = []
+        self.last_turn_alive = 0
+        self.dead = False
+        self.error = None
+        self.ships_spawned = 0
+        self.total_mined = 0
+        self.total_deposited = 0
+
+    @property
+    def active(self):
+        """
+        :return: Whether the player is still playing, i.e. neither dead nor kicked
+        """
+        return not self.dead and self.error is None
+
+    @property
+    def structures(self):
+        """
+        :return: The (x, y) locations of the player's shipyard and dropoffs
+        """
+        return [self.factory] + list(self.dropoffs.values())
+
+
+class Game:
+    """
+    A game between bot subprocesses. Call run() to play it to the end.
+    """
+    def __init__(self, bot_commands, width, height, seed=None, names=None, constants=None,
+                 timeouts=True, turn_limit=None):
+        """
+        :param bot_commands: The shell command that starts each bot
+        :param width: The map width
+        :param height: The map height
+        :param seed: The map seed, random if None
+        :param names: Names replacing those the bots report, by player id
+        :param constants: Optional dict of constants replacing the defaults
+        :param timeouts: Whether bots are kicked for taking too long
+        :param turn_limit: Optional turn count replacing the map size's turn limit
+        """
+        self.width = width
+        self.height = height
+        self.seed = random.randrange(1 << 31) if seed is None else seed
+        self.constants = game_constants(width, height, self.seed, constants)
+        if turn_limit is not None:
+            self.constants['MAX_TURNS'] = turn_limit
+        self.timeouts = timeouts
+        self.grid, factories = generate_map(width, height, len(bot_commands), self.seed, self.constants)
+        self.players = [_Player(player_id, command, factory, self.constants['INITIAL_ENERGY'])
+                        for player_id, (command, factory) in enumerate(zip(bot_commands, factories))]
+        self._names = names or []
+        self._sent_grid = [list(row) for row in self.grid]
+        self._next_entity_id = 0
+        self._structures = {player.factory: player.id for player in self.players}
+        self._inspiration_offsets = [
+            (dx, dy)
+            for dx in range(-self.constants['INSPIRATION_RADIUS'], self.constants['INSPIRATION_RADIUS'] + 1)
+            for dy in range(abs(dx) - self.constants['INSPIRATION_RADIUS'],
+                            self.constants['INSPIRATION_RADIUS'] - abs(dx) + 1)
+        ]
+        self.frames = []
+        self.turn_number = 0
+
+    def run(self):
+        """
+        Starts the bots, plays every turn and shuts the bots down.
+        :return: nothing.
+        """
+        try:
+            self._initialize()
+            for turn_number in range(1, self.constants['MAX_TURNS'] + 1):
+                self.turn_number = turn_number
+                self._play_turn()
+                active = [player for player in self.players if player.active]
+                if not active or (len(self.players) > 1 and len(active) < 2):
+                    break
+        finally:
+            for player in self.players:
+                if player.bot is not None:
+                    player.bot.close()
+
+    def _deadline(self, timeout):
+        return time.perf_counter() + timeout if self.timeouts else None
+
+    def _kick(self, player, error):
+        """
+        Removes a player from the game after its bot failed.
+        :return: nothing.
+        """
+        player.error = str(error)
+        player.last_turn_alive = max(0, self.turn_number - 1)
+        player.ships.clear()
+        player.bot.close()
+
+    def _initialize(self):
+        """
+        Starts the bots, sends them the initial game state and waits for their names.
+        :return: nothing.
+        """
+        lines = [json.dumps(self.constants), None]
+        lines.extend("{} {} {}".format(player.id, *player.factory) for player in self.players)
+        lines.append("{} {}".format(self.width, self.height))
+        lines.extend(" ".join(map(str, row)) for row in self.grid)
+
+        for player in self.players:
+            player.bot = _Bot(player.command)
+        deadline = self._deadline(INIT_TIMEOUT)
+        for player in self.players:
+            lines[1] = "{} {}".format(len(self.players), player.id)
+            try:
+                player.bot.send("\n".join(lines) + "\n")
+            except BotError as error:
+                self._kick(player, error)
+        for player in self.players:
+            if player.error is None:
+                try:
+                    player.name = player.bot.receive(deadline).strip() or player.command
+                except BotError as error:
+                    self._kick(player, error)
+            if player.id < len(self._names):
+                player.name = self._names[player.id]
+
+    def _serialize_frame(self):
+        """
+        :return: The turn's input for the bots: the turn number, every player's entities and the changed cells
+        """
+        lines = [str(self.turn_number)]
+        for player in self.players:
+            lines.append("{} {} {} {}".format(player.id, len(player.ships), len(player.dropoffs), player.halite))
+            lines.extend("{} {} {} {}".format(ship.id, ship.x, ship.y, ship.halite) for ship in player.ships.values())
+            lines.extend("{} {} {}".format(dropoff_id, x, y) for dropoff_id, (x, y) in player.dropoffs.items())
+        changed = []
+        for y, (row, sent_row) in enumerate(zip(self.grid, self._sent_grid)):
+            if row != sent_row:
+                for x, (halite, sent_halite) in enumerate(zip(row, sent_row)):
+                    if halite != sent_halite:
+                        changed.append("{} {} {}".format(x, y, halite))
+                        sent_row[x] = halite
+        lines.append(str(len(changed)))
+        lines.extend(changed)
+        return "\n".join(lines) + "\n"
+
+    def _parse_commands(self, player, line):
+        """
+        Parses and validates one player's commands for the turn.
+        :return: Whether the player spawns, the ships converting to dropoffs, and a dict of ship id to direction
+        """
+        tokens = line.split()
+        spawn = False
+        constructs = []
+        moves = {}
+        commanded = set()
+        position = 0
+        while position < len(tokens):
+            command = tokens[position]
+            if command == _SPAWN:
+                if spawn:
+                    raise BotError("Bot spawned more than once in a turn.")
+                spawn = True
+                position += 1
+                continue
+            if command not in (_CONSTRUCT, _MOVE) or position + 1 >= len(tokens):
+                raise BotError("Bot sent an invalid command: {}".format(" ".join(tokens[position:position + 3])))
+            try:
+                ship = player.ships[int(tokens[position + 1])]
+            except (KeyError, ValueError):
+                raise BotError("Bot commanded a ship it does not own: {}".format(tokens[position + 1]))
+            if ship.id in commanded:
+                raise BotError("Bot commanded ship {} more than once.".format(ship.id))
+            commanded.add(ship.id)
+            if command == _CONSTRUCT:
+                if (ship.x, ship.y) in self._structures:
+                    raise BotError("Bot tried to build a dropoff on a structure with ship {}.".format(ship.id))
+                constructs.append(ship)
+                position += 2
+            else:
+                if position + 2 >= len(tokens) or tokens[position + 2] not in _DIRECTIONS:
+                    raise BotError("Bot sent an invalid direction for ship {}.".format(ship.id))
+                moves[ship.id] = tokens[position + 2]
+                position += 3
+
+        halite = player.halite - (self.constants['NEW_ENTITY_ENERGY_COST'] if spawn else 0)
+        for ship in constructs:
+            halite += ship.halite + self.grid[ship.y][ship.x] - self.constants['DROPOFF_COST']
+        if halite < 0:
+            raise BotError("Bot does not have enough halite for its commands.")
+        return spawn, constructs, moves
+
+    def _play_turn(self):
+        """
+        Sends the turn to the bots, collects their commands and applies them.
+        :return: nothing.
+        """
+        frame_text = self._serialize_frame()
+        frame = {
+            'energy': {player.id: player.halite for player in self.players},
+            'entities': {player.id: {ship.id: {'x': ship.x, 'y': ship.y, 'energy': ship.halite,
+                                               'is_inspired': ship.inspired}
+                                     for ship in player.ships.values()}
+                         for player in self.players},
+            'events': [],
+            'moves': {},
+        }
+
+        playing = [player for player in self.players if player.error is None]
+        for player in playing:
+            try:
+                player.bot.send(frame_text)
+            except BotError as error:
+                self._kick(player, error)
+        deadline = self._deadline(TURN_TIMEOUT)
+        commands = {}
+        for player in playing:
+            if player.error is not None:
+                continue
+            try:
+                commands[player.id] = self._parse_commands(player, player.bot.receive(deadline))
+            except BotError as error:
+                self._kick(player, error)
+
+        self._apply_commands(commands, frame)
+        for player in self.players:
+            player.halite_history.append(player.halite)
+            if player.active and not player.ships and player.halite < self.constants['NEW_ENTITY_ENERGY_COST']:
+                player.dead = True
+            if player.active:
+                player.last_turn_alive = self.turn_number
+
+        frame['cells'] = [{'x': x, 'y': y, 'production': halite}
+                          for y, (row, sent_row) in enumerate(zip(self.grid, self._sent_grid)) if row != sent_row
+                          for x, (halite, sent_halite) in enumerate(zip(row, sent_row)) if halite != sent_halite]
+        frame['deposited'] = {player.id: player.total_deposited for player in self.players}
+        self.frames.append(frame)
+
+    def _apply_commands(self, commands, frame):
+        """
+        Applies the turn's commands: dropoffs are built, ships move and spawn, collisions sink ships,
+        ships that did not move mine, cargo is deposited and inspiration is updated for the next turn.
+        :param commands: The parsed commands of each player, by player id
+        :param frame: The replay frame of the turn, to record moves and events in
+        :return: nothing.
+        """
+        stayed = []
+        spawned = []
+        for player_id, (spawn, constructs, moves) in sorted(commands.items()):
+            player = self.players[player_id]
+            replay_moves = frame['moves'].setdefault(player_id, [])
+
+            for ship in constructs:
+                location = (ship.x, ship.y)
+                player.halite += ship.halite + self.grid[ship.y][ship.x] - self.constants['DROPOFF_COST']
+                self.grid[ship.y][ship.x] = 0
+                del player.ships[ship.id]
+                player.dropoffs[ship.id] = location
+                self._structures[location] = player.id
+                replay_moves.append({'type': _CONSTRUCT, 'id': ship.id})
+                frame['events'].append({'type': 'construct', 'id': ship.id, 'owner_id': player.id,
+                                        'location': {'x': ship.x, 'y': ship.y}})
+
+            for ship in player.ships.values():
+                direction = moves.get(ship.id, _STILL)
+                if direction != _STILL:
+                    ratio = self.constants['INSPIRED_MOVE_COST_RATIO' if ship.inspired else 'MOVE_COST_RATIO']
+                    cost = self.grid[ship.y][ship.x] // ratio
+                    if ship.halite >= cost:
+                        ship.halite -= cost
+                        dx, dy = _DIRECTIONS[direction]
+                        ship.x = (ship.x + dx) % self.width
+                        ship.y = (ship.y + dy) % self.height
+                        replay_moves.append({'type': _MOVE, 'id': ship.id, 'direction': direction})
+                        continue
+                stayed.append(ship)
+
+            if spawn:
+                player.halite -= self.constants['NEW_ENTITY_ENERGY_COST']
+                ship = _Ship(self._next_entity_id, player.id, *player.factory)
+                self._next_entity_id += 1
+                player.ships[ship.id] = ship
+                player.ships_spawned += 1
+                spawned.append(ship)
+                replay_moves.append({'type': _SPAWN})
+                frame['events'].append({'type': 'spawn', 'id': ship.id, 'owner_id': player.id, 'energy': 0,
+                                        'location': {'x': ship.x, 'y': ship.y}})
+
+        self._resolve_collisions(frame)
+
+        for ship in stayed:
+            if ship.id in self.players[ship.owner].ships:
+                self._mine(ship)
+
+        for player in self.players:
+            for ship in player.ships.values():
+                if self._structures.get((ship.x, ship.y)) == player.id and ship.halite:
+                    player.halite += ship.halite
+                    player.total_deposited += ship.halite
+                    ship.halite = 0
+
+        self._update_inspiration()
+
+    def _resolve_collisions(self, frame):
+        """
+        Sinks every ship sharing a cell with another. Their cargo goes to the owner of a structure on the cell,
+        or into the sea otherwise.
+        :return: nothing.
+        """
+        cells = {}
+        for player in self.players:
+            for ship in player.ships.values():
+                cells.setdefault((ship.x, ship.y), []).append(ship)
+        for (x, y), ships in cells.items():
+            if len(ships) < 2:
+                continue
+            cargo = sum(ship.halite for ship in ships)
+            owner = self._structures.get((x, y))
+            if owner is None:
+                self.grid[y][x] += cargo
+            else:
+                self.players[owner].halite += cargo
+            for ship in ships:
+                del self.players[ship.owner].ships[ship.id]
+            frame['events'].append({'type': 'shipwreck', 'ships': [ship.id for ship in ships],
+                                    'location': {'x': x, 'y': y}})
+
+    def _mine(self, ship):
+        """
+        Has a ship that stayed still collect a quarter of its cell's halite, rounded up, plus the bonus if inspired.
+        :return: nothing.
+        """
+        halite = self.grid[ship.y][ship.x]
+        ratio = self.constants['INSPIRED_EXTRACT_RATIO' if ship.inspired else 'EXTRACT_RATIO']
+        capacity = self.constants['MAX_ENERGY'] - ship.halite
+        extracted = min(int(math.ceil(halite / ratio)), capacity)
+        bonus = 0
+        if ship.inspired:
+            bonus = min(int(extracted * self.constants['INSPIRED_BONUS_MULTIPLIER']), capacity - extracted)
+        self.grid[ship.y][ship.x] -= extracted
+        ship.halite += extracted + bonus
+        self.players[ship.owner].total_mined += extracted + bonus
+
+    def _update_inspiration(self):
+        """
+        Marks ships with enough opponent ships nearby as inspired for the next turn.
+        :return: nothing.
+        """
+        owners = {(ship.x, ship.y): player.id for player in self.players for ship in player.ships.values()}
+        required = self.constants['INSPIRATION_SHIP_COUNT']
+        for player in self.players:
+            for ship in player.ships.values():
+                if not self.constants['INSPIRATION_ENABLED']:
+                    ship.inspired = False
+                    continue
+                opponents = 0
+                for dx, dy in self._inspiration_offsets:
+                    owner = owners.get(((ship.x + dx) % self.width, (ship.y + dy) % self.height), player.id)
+                    if owner != player.id:
+                        opponents += 1
+                        if opponents >= required:
+                            break
+                ship.inspired = opponents >= required
+
+    def ranking(self):
+        """
+        Ranks players by the last turn they were alive, then by their halite on the last turn, the turn before, etc.
+        :return: The players, best first
+        """
+        return sorted(self.players,
+                      key=lambda player: (player.last_turn_alive, player.halite_history[::-1]),
+                      reverse=True)
+
+    def replay(self):
+        """
+        :return: The replay of the game, in the layout of the official engine's replay files
+        """
+        ranks = {player.id: rank for rank, player in enumerate(self.ranking(), 1)}
+        return {
+            'ENGINE_VERSION': ENGINE_VERSION,
+            'GAME_CONSTANTS': self.constants,
+            'REPLAY_FILE_VERSION': REPLAY_FILE_VERSION,
+            'full_frames': self.frames,
+            'game_statistics': {
+                'number_turns': len(self.frames),
+                'player_statistics': [{
+                    'player_id': player.id,
+                    'rank': ranks[player.id],
+                    'last_turn_alive': player.last_turn_alive,
+                    'final_production': player.halite,
+                    'total_mined': player.total_mined,
+                    'total_dropped': player.total_deposited,
+                    'ships_spawned': player.ships_spawned,
+                    'number_dropoffs': len(player.dropoffs),
+                } for player in self.players],
+            },
+            'map_generator_seed': self.seed,
+            'number_of_players': len(self.players),
+            'players': [{'player_id': player.id, 'name': player.name,
+                         'factory_location': {'x': player.factory[0], 'y': player.factory[1]}}
+                        for player in self.players],
+            'production_map': {
+                'map_generator': MAP_GENERATOR,
+                'width': self.width,
+                'height': self.height,
+                'grid': [[{'energy': halite} for halite in row] for row in self._initial_grid()],
+            },
+        }
+
+    def _initial_grid(self):
+        """
+        :return: The halite grid before the first turn, rebuilt from the map seed
+        """
+        return generate_map(self.width, self.height, len(self.players), self.seed, self.constants)[0]
+
+
+def _write_replay(game, replay_directory, timestamp):
+    """
+    Writes the zstd compressed replay of a game.
+    :return: The path of the replay file
+    """
+    path = os.path.join(replay_directory, 'replay-{}-{}-{}-{}.hlt'.format(
+        timestamp, game.seed, game.width, game.height))
+    with open(path, 'wb') as replay_file:
+        replay_file.write(zstd.dumps(json.dumps(game.replay()).encode()))
+    return path
+
+
+def _write_error_logs(game, replay_directory, timestamp):
+    """
+    Writes the error and stderr output of every kicked bot to its own log file.
+    :return: The path of each log file, by player id
+    """
+    error_logs = {}
+    for player in game.players:
+        if player.error is None:
+            continue
+        path = os.path.join(replay_directory, 'errorlog-{}-{}-{}.log'.format(timestamp, game.seed, player.id))
+        with open(path, 'w') as log_file:
+            log_file.write("{}\n{}".format(player.error, player.bot.stderr))
+        error_logs[str(player.id)] = path
+    return error_logs
+
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(prog='python3 -m hlt_client.engine',
+                                     description="Play a game of Halite III with the builtin rules engine.")
+    parser.add_argument('bot_commands', nargs='+', metavar='BOT_COMMAND',
+                        help="The command to run each bot. Give 1, 2 or 4 of these.")
+    parser.add_argument('--width', type=int, default=None, help="The map width, random if not given.")
+    parser.add_argument('--height', type=int, default=None, help="The map height, the width if not given.")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="The map seed, random if not given.")
+    parser.add_argument('-i', '--replay-directory', default='.', help="Where to write replays and error logs.")
+    parser.add_argument('--no-replay', action='store_true', help="Do not write a replay.")
+    parser.add_argument('--no-logs', action='store_true', help="Do not write error logs.")
+    parser.add_argument('--no-timeout', action='store_true', help="Never kick bots for taking too long.")
+    parser.add_argument('--turn-limit', type=int, default=None, help="Replace the map size's turn limit.")
+    parser.add_argument('-o', '--override-names', dest='names', action='append', default=[],
+                        help="Replace the name of the next bot. May be given once per bot.")
+    parser.add_argument('-v', '--verbosity', action='count', default=0,
+                        help="Accepted for compatibility with the halite binary.")
+    parser.add_argument('--results-as-json', action='store_true', help="Print the game results as JSON.")
+    return parser.parse_args(arguments)
+
+
+def _play(args):
+    """
+    Plays one game from parsed command line arguments.
+    :return: The finished game and its results
+    """
+    width = args.width or random.choice(MAP_SIZES)
+    height = args.height or width
+    game = Game(args.bot_commands, width, height, seed=args.seed, names=args.names,
+                timeouts=not args.no_timeout, turn_limit=args.turn_limit)
+    start = time.perf_counter()
+    game.run()
+    execution_time = int((time.perf_counter() - start) * 1000)
+
+    timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    replay = None
+    error_logs = {}
+    if not args.no_replay or not args.no_logs:
+        os.makedirs(args.replay_directory, exist_ok=True)
+    if not args.no_replay:
+        replay = _write_replay(game, args.replay_directory, timestamp)
+    if not args.no_logs:
+        error_logs = _write_error_logs(game, args.replay_directory, timestamp)
+
+    ranks = {player.id: rank for rank, player in enumerate(game.ranking(), 1)}
+    return game, {
+        'error_logs': error_logs,
+        'execution_time': execution_time,
+        'final_snapshot': '',
+        'map_generator': MAP_GENERATOR,
+        'map_height': height,
+        'map_seed': game.seed,
+        'map_width': width,
+        'replay': replay,
+        'stats': {str(player.id): {'rank': ranks[player.id], 'score': player.halite} for player in game.players},
+        'terminated': {str(player.id): player.error is not None for player in game.players},
+    }
+
+
+def run(arguments):
+    """
+    Plays one game from halite binary style command line arguments.
+    :param arguments: The command line arguments, without the program name
+    :return: The game results, as printed by --results-as-json
+    """
+    return _play(parse_arguments(arguments))[1]
+
+
+def main():
+    args = parse_arguments()
+    game, results = _play(args)
+    if args.results_as_json:
+        print(json.dumps(results))
+        return
+    print("Map seed was {}".format(game.seed))
+    if results['replay']:
+        print("Opening a file at {}".format(results['replay']))
+    for rank, player in enumerate(game.ranking(), 1):
+        print("Player #{}, {}, came in rank #{} and was last alive on frame #{}, producing {} ships and "
+              "generating {} halite!".format(player.id, player.name, rank, player.last_turn_alive,
+                                              player.ships_spawned, player.halite))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,9 @@
+import collections
+import concurrent.futures
 import datetime
+import itertools
 import json
+import math
 import os
 import random
 import sqlite3
@@ -9,7 +13,7 @@ import subprocess
 import appdirs
 import trueskill
 
-from . import compare_bots, output, util
+from . import compare_bots, engine, output, util
 
 
 APP_NAME = 'hlt_client3'
@@ -24,6 +28,14 @@ STATS_MODE = 'stats'
 BASE_MU = 25.0
 BASE_SIGMA = 8.333
 MIN_PLAYERS = 2
+# Results of this many matches are written to the database in one transaction
+WRITE_BATCH_SIZE = 16
+
+RANDOM_MATCHMAKING = 'random'
+INFORMATIVE_MATCHMAKING = 'informative'
+MATCHMAKING_MODES = (RANDOM_MATCHMAKING, INFORMATIVE_MATCHMAKING)
+# Informative matchmaking rates at most this many candidate matches, sampled at random when there are more
+MAX_CANDIDATE_MATCHES = 64
 
 SCHEMA = '''
 create table hlt_client_version (version INTEGER);
@@ -55,6 +67,30 @@ create table rank_history (
 )
 '''
 
+# Scripts upgrading the database from the version of their index to the next, recorded in hlt_client_version
+MIGRATIONS = [
+    '''
+    pragma journal_mode = wal;
+    create index if not exists rank_history_bot_id on rank_history(bot_id);
+    create index if not exists games_winner on games(winner);
+    ''',
+]
+
+# Ranks every bot by score, mu - 3 * sigma, ties going to the older bot. UPDATE ... FROM needs SQLite 3.33;
+# older versions count the better bots of each bot instead, which is quadratic in the number of bots.
+RERANK_QUERY = '''
+update bots set rank = ranked.rank
+from (select id, row_number() over (order by mu - 3 * sigma desc, id) as rank from bots) as ranked
+where bots.id = ranked.id
+'''
+RERANK_QUERY_LEGACY = '''
+update bots set rank = 1 + (
+    select count(*) from bots as other
+    where other.mu - 3 * other.sigma > bots.mu - 3 * bots.sigma
+       or (other.mu - 3 * other.sigma = bots.mu - 3 * bots.sigma and other.id < bots.id)
+)
+'''
+
 def connect(db_path=None):
     if not db_path:
         db_path = os.path.join(appdirs.user_data_dir(APP_NAME, APP_AUTHOR), 'gym.db')
@@ -70,6 +106,7 @@ def connect(db_path=None):
     except sqlite3.OperationalError:
         initialize_db(conn)
 
+    migrate_db(conn)
     return conn
 
 
@@ -77,12 +114,20 @@ def initialize_db(conn):
     conn.executescript(SCHEMA)
 
 
+def migrate_db(conn):
+    """
+    Upgrades the database in place to the latest version, running the migrations it has not had yet.
+    """
+    version = conn.execute('select max(version) from hlt_client_version').fetchone()[0] or 0
+    for new_version in range(version + 1, len(MIGRATIONS) + 1):
+        conn.executescript(MIGRATIONS[new_version - 1])
+        with conn:
+            conn.execute('delete from hlt_client_version')
+            conn.execute('insert into hlt_client_version (version) values (?)', (new_version,))
+
+
 def rerank_bots(conn):
-    all_bots = conn.execute('select * from bots').fetchall()
-    all_bots.sort(reverse=True, key=lambda bot: bot['mu'] - 3 * bot['sigma'])
-    for index, bot in enumerate(all_bots):
-        rank = index + 1
-        conn.execute('update bots set rank = ? where id = ?', (rank, bot['id']))
+    conn.execute(RERANK_QUERY if sqlite3.sqlite_version_info >= (3, 33, 0) else RERANK_QUERY_LEGACY)
 
 
 def register_bot(conn, name, path):
@@ -115,83 +160,201 @@ def list_bots(conn):
     return [dict(bot) for bot in bots]
 
 
-def add_match(conn, bots, results):
-    winner = None
-    for id_str, stats in results['stats'].items():
-        if stats['rank'] == 1:
-            winner = int(id_str)
-
-    if winner is None:
-        raise ValueError('Could not detect winner of game')
-
-    query = 'insert into games (datetime, winner, participants, results) values (?, ?, ?, ?)'
-    del results['final_snapshot']
-    current_time = datetime.datetime.now().isoformat()
-    conn.execute(query, (current_time,
-                         bots[winner]['id'],
-                         json.dumps(bots),
-                         json.dumps(results)))
-
-    for bot in bots:
-        history_query = 'insert into rank_history (bot_id, datetime, rank, mu, sigma) values (?, ?, ?, ?, ?)'
-        conn.execute(history_query, (bot['id'],
-                                     current_time,
-                                     bot['rank'],
-                                     bot['mu'],
-                                     bot['sigma']))
-        games_played_query = 'update bots set games_played=games_played + 1 where id = ?'
-        conn.execute(games_played_query, (bot['id'],))
-
-    trueskill.setup(tau=0.008, draw_probability=0.001)
-    teams = [[trueskill.Rating(mu=bot["mu"], sigma=bot["sigma"])]
-             for bot in bots]
-    ranks = [results["stats"][str(b)]["rank"] - 1 for b in range(len(bots))]
-    new_ratings = trueskill.rate(teams, ranks)
-
-    update_query = 'update bots set mu=?, sigma=? where id=?'
-    for bot, rating in zip(bots, new_ratings):
-        conn.execute(update_query, (rating[0].mu, rating[0].sigma, bot['id']))
-
-    rerank_bots(conn)
-
+def _rank_key(bot):
+    return bot['mu'] - 3 * bot['sigma']
+
+
+class _MatchWriter:
+    """
+    Applies match results to the bots' ratings as they arrive, keeping the ratings in memory, and writes
+    the matches, rank history and ratings to the database in batches of one transaction each.
+    """
+    def __init__(self, conn, batch_size=WRITE_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.bots = {bot['id']: bot for bot in list_bots(conn)}
+        self._games = []
+        self._history = []
+        self._played = collections.Counter()
+        trueskill.setup(tau=0.008, draw_probability=0.001)
+
+    def add(self, bots, results):
+        """
+        Rates a match against the current ratings of its bots.
+        :param bots: The bots as they were when the match was set up, indexed by player id
+        :param results: The results of the match
+        :return: nothing.
+        """
+        winner = None
+        for id_str, stats in results['stats'].items():
+            if stats['rank'] == 1:
+                winner = int(id_str)
+
+        if winner is None:
+            raise ValueError('Could not detect winner of game')
+
+        results.pop('final_snapshot', None)
+        current_time = datetime.datetime.now().isoformat()
+        self._games.append((current_time, bots[winner]['id'], json.dumps(bots), json.dumps(results)))
+
+        current_bots = [self.bots[bot['id']] for bot in bots]
+        for bot in current_bots:
+            self._history.append((bot['id'], current_time, bot['rank'], bot['mu'], bot['sigma']))
+            self._played[bot['id']] += 1
+            bot['games_played'] += 1
+
+        teams = [[trueskill.Rating(mu=bot["mu"], sigma=bot["sigma"])]
+                 for bot in current_bots]
+        ranks = [results["stats"][str(b)]["rank"] - 1 for b in range(len(bots))]
+        new_ratings = trueskill.rate(teams, ranks)
+        for bot, rating in zip(current_bots, new_ratings):
+            bot['mu'], bot['sigma'] = rating[0].mu, rating[0].sigma
+
+        for rank, bot in enumerate(sorted(self.bots.values(), reverse=True, key=_rank_key)):
+            bot['rank'] = rank + 1
+
+        if len(self._games) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the matches added since the last flush in one transaction.
+        :return: nothing.
+        """
+        if not self._games:
+            return
+        with self.conn:
+            self.conn.executemany('insert into games (datetime, winner, participants, results) values (?, ?, ?, ?)',
+                                  self._games)
+            self.conn.executemany('insert into rank_history (bot_id, datetime, rank, mu, sigma) values (?, ?, ?, ?, ?)',
+                                  self._history)
+            self.conn.executemany('update bots set mu=?, sigma=?, games_played=games_played + ? where id=?',
+                                  [(self.bots[bot_id]['mu'], self.bots[bot_id]['sigma'], played, bot_id)
+                                   for bot_id, played in self._played.items()])
+            rerank_bots(self.conn)
+        self._games = []
+        self._history = []
+        self._played.clear()
 
-def run_matches(db_path, hlt_path, output_dir, iterations):
-    flags = []
 
+def add_match(conn, bots, results):
+    writer = _MatchWriter(conn)
+    writer.add(bots, results)
+    writer.flush()
+
+
+def _sigma_reduction(bots):
+    """
+    :param bots: The bots of a candidate match
+    :return: How much the match would reduce the sum of the bots' rating variances, if it ended as their ratings predict
+    """
+    bots = sorted(bots, reverse=True, key=lambda bot: bot['mu'])
+    new_ratings = trueskill.rate([[trueskill.Rating(mu=bot['mu'], sigma=bot['sigma'])] for bot in bots])
+    return sum(bot['sigma'] ** 2 - rating[0].sigma ** 2 for bot, rating in zip(bots, new_ratings))
+
+
+def _candidate_matches(bots):
+    """
+    :param bots: The bots to match
+    :return: Every 2 and 4 bot match, or MAX_CANDIDATE_MATCHES distinct ones sampled at random if there are more
+    """
+    sizes = [num_players for num_players in (2, 4) if num_players <= len(bots)]
+    num_matches = sum(math.factorial(len(bots)) // (math.factorial(size) * math.factorial(len(bots) - size))
+                      for size in sizes)
+    if num_matches <= MAX_CANDIDATE_MATCHES:
+        return [match for size in sizes for match in itertools.combinations(bots, size)]
+
+    candidates = {}
+    # Sampling draws repeats, so stop after a bounded number of tries even if short of MAX_CANDIDATE_MATCHES
+    for _ in range(4 * MAX_CANDIDATE_MATCHES):
+        match = random.sample(bots, random.choice(sizes))
+        candidates.setdefault(frozenset(bot['id'] for bot in match), match)
+        if len(candidates) == MAX_CANDIDATE_MATCHES:
+            break
+    return list(candidates.values())
+
+
+def _choose_bots(all_bots, matchmaking=RANDOM_MATCHMAKING, busy=()):
+    """
+    :param all_bots: The registered bots, at least MIN_PLAYERS of them
+    :param matchmaking: RANDOM_MATCHMAKING to pick bots and the player count at random, or INFORMATIVE_MATCHMAKING
+                        to pick the 2 or 4 player match expected to shrink the bots' sigmas the most
+    :param busy: The ids of bots playing in unfinished matches, which informative matchmaking avoids
+    :return: Copies of the bots to play the next match
+    """
+    all_bots = list(all_bots)
+    if matchmaking == INFORMATIVE_MATCHMAKING:
+        idle = [bot for bot in all_bots if bot['id'] not in busy]
+        candidates = _candidate_matches(idle if len(idle) >= MIN_PLAYERS else all_bots)
+        bots = list(max(candidates, key=_sigma_reduction))
+        random.shuffle(bots)
+        return [dict(bot) for bot in bots]
+
+    num_players = random.choice((2, 4))
+    if len(all_bots) < num_players:
+        num_players = MIN_PLAYERS
+
+    random.shuffle(all_bots)
+    return [dict(bot) for bot in all_bots[:num_players]]
+
+
+def run_matches(db_path, hlt_path, output_dir, iterations, parallel=1, matchmaking=RANDOM_MATCHMAKING):
+    """
+    Plays matches between registered bots in worker processes, up to parallel at a time. Results are rated
+    in the order matches finish and written in batches by this process, the only one using the database.
+    :param db_path: The database file, or None for the default
+    :param hlt_path: The halite binary, or engine.BUILTIN_ENGINE
+    :param output_dir: Where to put replays and logs. Matches played in parallel each get a game-<n> subdirectory.
+    :param iterations: How many matches to play
+    :param parallel: How many matches to play at once
+    :param matchmaking: How to pick the bots of each match, RANDOM_MATCHMAKING or INFORMATIVE_MATCHMAKING
+    :return: Nothing
+    """
     if output_dir:
-        abs_output_dir = os.path.abspath(output_dir)
-        os.makedirs(abs_output_dir, exist_ok=True)
-        flags = ['-i', abs_output_dir]
-
-    for i in range(iterations):
-        with connect(db_path) as conn:
-            all_bots = list_bots(conn)
-            num_players = random.choice((2, 4))
-            if len(all_bots) < MIN_PLAYERS:
-                output.error('Need at least {} bots registered to play.'.format(MIN_PLAYERS))
-                sys.exit(1)
-            elif len(all_bots) < num_players:
-                num_players = MIN_PLAYERS
-
-            random.shuffle(all_bots)
-            bots = all_bots[:num_players]
-
+        output_dir = os.path.abspath(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+
+    conn = connect(db_path)
+    writer = _MatchWriter(conn)
+    if len(writer.bots) < MIN_PLAYERS:
+        output.error('Need at least {} bots registered to play.'.format(MIN_PLAYERS))
+        sys.exit(1)
+
+    def _start_match(executor, match_number):
+        busy = {bot['id'] for bots in running.values() for bot in bots}
+        bots = _choose_bots(writer.bots.values(), matchmaking, busy)
         overrides = []
         for bot in bots:
             overrides.append('-o')
             overrides.append(bot['name'])
-        raw_results = compare_bots._play_game(hlt_path,
-                                              [bot['path'] for bot in bots],
-                                              flags + overrides)
-        results = json.loads(raw_results)
-        with connect(db_path) as conn:
-            add_match(conn, bots, results)
-
-        output.output('Played {}/{} matches...'.format(i + 1, iterations),
-                      progress=i + 1,
-                      iterations=iterations,
-                      results=results,
-                      participants=bots)
+        flags = compare_bots._game_flags([], output_dir or None, match_number, parallel) + overrides
+        running[executor.submit(compare_bots._play_game, hlt_path, [bot['path'] for bot in bots], flags)] = bots
+
+    running = {}
+    started = played = 0
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max(parallel, 1)) as executor:
+            while started < min(parallel, iterations):
+                _start_match(executor, started)
+                started += 1
+            while running:
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for match in done:
+                    bots = running.pop(match)
+                    results = json.loads(match.result())
+                    writer.add(bots, results)
+                    played += 1
+                    output.output('Played {}/{} matches...'.format(played, iterations),
+                                  progress=played,
+                                  iterations=iterations,
+                                  results=results,
+                                  participants=bots)
+                    if started < iterations:
+                        _start_match(executor, started)
+                        started += 1
+    finally:
+        writer.flush()
+        conn.close()
     output.output('Done playing games.', progress=iterations, iterations=iterations)
 
 
@@ -288,7 +451,7 @@ def main(args):
         output_dir = args.game_output_dir
         iterations = args.iterations
 
-        run_matches(args.db_path, hlt_path, output_dir, iterations)
+        run_matches(args.db_path, hlt_path, output_dir, iterations, args.parallel, args.matchmaking)
 
 
 def parse_arguments(subparser):
@@ -317,7 +480,8 @@ def parse_arguments(subparser):
                                  dest='halite_binary',
                                  action='store',
                                  type=str, required=True,
-                                 help="The halite executable/binary path, used to run the games")
+                                 help="The halite executable/binary path, used to run the games. "
+                                      "Pass '{}' to use the pure-Python engine bundled with the client.".format(engine.BUILTIN_ENGINE))
     evaluate_parser.add_argument('--output-dir',
                                  dest='game_output_dir',
                                  action='store',
@@ -329,6 +493,19 @@ def parse_arguments(subparser):
                                  type=int, required=False,
                                  default=10,
                                  help="Number of games to play.")
+    evaluate_parser.add_argument('-p', '--parallel',
+                                 dest='parallel',
+                                 action='store',
+                                 type=int, required=False,
+                                 default=1,
+                                 help="Number of games to play at once, each in its own worker process.")
+    evaluate_parser.add_argument('-m', '--matchmaking',
+                                 dest='matchmaking',
+                                 action='store',
+                                 choices=MATCHMAKING_MODES, required=False,
+                                 default=RANDOM_MATCHMAKING,
+                                 help="How to pick the bots of each game: at random, or the game expected to tell "
+                                      "the most about the bots' current ratings ('{}').".format(INFORMATIVE_MATCHMAKING))
 
     stats_parser = gym_subparser.add_parser(STATS_MODE, help='Get stats from the gym.')
     stats_parser.add_argument('query', nargs='?', type=str,
@@ -0,0 +1,228 @@
+"""
+Reads Halite III replays into compact numpy arrays.
+
+Replays are zstd compressed JSON, often hundreds of megabytes once inflated. The reader inflates them as a
+stream and decodes one frame at a time, keeping only each frame's changed cells and entities as rows of
+numpy arrays, so neither the decoded JSON nor one Python object per cell is ever held in memory.
+"""
+import io
+import json
+
+import numpy as np
+import zstandard
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_READ_CHUNK_SIZE = 1 << 16
+_WHITESPACE = ' \t\n\r'
+
+_FRAMES_KEY = 'full_frames'
+_PRODUCTION_MAP_KEY = 'production_map'
+
+# Columns of the cell and ship tables, one row per changed cell or ship per frame
+CELL_COLUMNS = ('x', 'y', 'halite')
+SHIP_COLUMNS = ('owner', 'id', 'x', 'y', 'halite', 'inspired')
+
+
+def _open_text(path):
+    """
+    Opens a replay as a text stream, inflating it on the fly if it is compressed.
+    :param path: The path of a .hlt replay, or of a decompressed .json one
+    :return: A text file object
+    """
+    replay_file = open(path, 'rb')
+    if replay_file.read(len(_ZSTD_MAGIC)) != _ZSTD_MAGIC:
+        replay_file.seek(0)
+        return io.TextIOWrapper(replay_file, encoding='utf-8')
+    replay_file.seek(0)
+    return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(replay_file), encoding='utf-8')
+
+
+class _JSONStream:
+    """
+    Decodes the values of a JSON document one at a time from a text stream, reading only as much as needed.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """
+        Reads the next chunk of the stream, dropping what has been consumed.
+        :return: Whether anything was read
+        """
+        chunk = self._stream.read(_READ_CHUNK_SIZE)
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        self._eof = not chunk
+        return bool(chunk)
+
+    def peek(self):
+        """
+        :return: The next character that is not whitespace, without consuming it
+        """
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                raise ValueError("Replay ended unexpectedly.")
+
+    def expect(self, character):
+        """
+        Consumes the next non-whitespace character, which must be the one given.
+        :return: nothing.
+        """
+        if self.peek() != character:
+            raise ValueError("Malformed replay: expected '{}' but found '{}'.".format(character, self.peek()))
+        self._position += 1
+
+    def value(self):
+        """
+        Decodes the next JSON value.
+        :return: The value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # A number running up to the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+class Replay:
+    """
+    A replay read into numpy arrays.
+
+    * constants, players, statistics, map_seed: replay metadata, as in the file
+    * initial_halite: [y, x] halite before the first frame
+    * player_halite, deposited: [frame, player] stored and deposited halite
+    * cells: [row, column] changes to the halite map, columns as in CELL_COLUMNS. The rows of frame f are
+      cells[cell_offsets[f]:cell_offsets[f + 1]], and apply after frame f.
+    * ships: [row, column] ships at the start of each frame, columns as in SHIP_COLUMNS. The rows of frame f
+      are ships[ship_offsets[f]:ship_offsets[f + 1]].
+    """
+    def __init__(self, path):
+        """
+        Reads a replay file.
+        :param path: The path of a .hlt replay, or of a decompressed .json one
+        """
+        self.metadata = {}
+        cell_rows = []
+        ship_rows = []
+        cell_counts = []
+        ship_counts = []
+        halite_rows = []
+        deposited_rows = []
+
+        with _open_text(path) as stream:
+            json_stream = _JSONStream(stream)
+            json_stream.expect('{')
+            while json_stream.peek() != '}':
+                key = json_stream.value()
+                json_stream.expect(':')
+                if key != _FRAMES_KEY:
+                    self.metadata[key] = json_stream.value()
+                else:
+                    json_stream.expect('[')
+                    while json_stream.peek() != ']':
+                        frame = json_stream.value()
+                        cells = [(cell['x'], cell['y'], cell['production']) for cell in frame.get('cells', ())]
+                        ships = [(int(player_id), int(ship_id), ship['x'], ship['y'], ship['energy'],
+                                  ship.get('is_inspired', False))
+                                 for player_id, player_ships in frame.get('entities', {}).items()
+                                 for ship_id, ship in player_ships.items()]
+                        cell_rows.append(np.array(cells, dtype=np.int32).reshape(-1, len(CELL_COLUMNS)))
+                        ship_rows.append(np.array(ships, dtype=np.int32).reshape(-1, len(SHIP_COLUMNS)))
+                        cell_counts.append(len(cells))
+                        ship_counts.append(len(ships))
+                        halite_rows.append(frame.get('energy', {}))
+                        deposited_rows.append(frame.get('deposited', {}))
+                        if json_stream.peek() == ',':
+                            json_stream.expect(',')
+                    json_stream.expect(']')
+                if json_stream.peek() == ',':
+                    json_stream.expect(',')
+
+        production_map = self.metadata.pop(_PRODUCTION_MAP_KEY)
+        self.width = production_map['width']
+        self.height = production_map['height']
+        self.initial_halite = np.array([[cell['energy'] for cell in row] for row in production_map['grid']],
+                                       dtype=np.int32)
+        self.constants = self.metadata.get('GAME_CONSTANTS', {})
+        self.players = self.metadata.get('players', [])
+        self.statistics = self.metadata.get('game_statistics', {})
+        self.map_seed = self.metadata.get('map_generator_seed')
+        self.num_players = self.metadata.get('number_of_players', len(self.players))
+        self.num_frames = len(cell_counts)
+
+        self.cells = np.concatenate(cell_rows or [np.zeros((0, len(CELL_COLUMNS)), dtype=np.int32)])
+        self.cell_offsets = np.concatenate(([0], np.cumsum(cell_counts))).astype(np.int64)
+        self.ships = np.concatenate(ship_rows or [np.zeros((0, len(SHIP_COLUMNS)), dtype=np.int32)])
+        self.ship_offsets = np.concatenate(([0], np.cumsum(ship_counts))).astype(np.int64)
+        self.player_halite = self._player_table(halite_rows)
+        self.deposited = self._player_table(deposited_rows)
+
+    def _player_table(self, rows):
+        """
+        :param rows: A dict of player id to value per frame
+        :return: A 2-D numpy array indexed as [frame, player], 0 where a frame has no value
+        """
+        table = np.zeros((len(rows), self.num_players), dtype=np.int64)
+        for frame, row in enumerate(rows):
+            for player_id, value in row.items():
+                table[frame, int(player_id)] = value
+        return table
+
+    def get_ships(self, frame):
+        """
+        :param frame: The frame number
+        :return: The rows of the ship table for the ships at the start of the frame
+        """
+        return self.ships[self.ship_offsets[frame]:self.ship_offsets[frame + 1]]
+
+    def get_halite_grid(self, frame):
+        """
+        Rebuilds the halite map at the start of a frame from the initial map and the changes of earlier frames.
+        :param frame: The frame number
+        :return: A 2-D numpy array indexed as [y, x]
+        """
+        grid = self.initial_halite.copy()
+        changes = self.cells[:self.cell_offsets[frame]]
+        if len(changes):
+            # Only the last change of each cell counts
+            indices = (changes[::-1, 1] * self.width + changes[::-1, 0])
+            _, last = np.unique(indices, return_index=True)
+            grid.ravel()[indices[last]] = changes[::-1, 2][last]
+        return grid
+
+    def iter_halite_grids(self):
+        """
+        Yields the halite map at the start of every frame in order, updating a single array in place.
+        Copy a grid to keep it past the next iteration.
+        :return: A generator of 2-D numpy arrays indexed as [y, x]
+        """
+        grid = self.initial_halite.copy()
+        flat_grid = grid.ravel()
+        for frame in range(self.num_frames):
+            yield grid
+            changes = self.cells[self.cell_offsets[frame]:self.cell_offsets[frame + 1]]
+            flat_grid[changes[:, 1] * self.width + changes[:, 0]] = changes[:, 2]
+
+
+def read_replay(path):
+    """
+    Reads a replay file into numpy arrays.
+    :param path: The path of a .hlt replay, or of a decompressed .json one
+    :return: A Replay
+    """
+    return Replay(path)
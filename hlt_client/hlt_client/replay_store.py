@@ -0,0 +1,381 @@
+"""
+A columnar, memory-mapped store of replays, for analysis and training jobs that read many games.
+
+`hlt replay convert` parses each replay once with hlt_client.replay and appends its tables to one raw
+binary file per column, which readers memory-map: a game's rows are then zero-copy slices of those maps,
+so reading a few turns of a few games only touches those bytes. An SQLite index maps each game to its
+rows and can be queried by game id, player, map size and date.
+
+Halite maps are stored as a key frame every KEY_FRAME_INTERVAL frames plus each frame's changed cells,
+so any frame's map is one key frame and at most KEY_FRAME_INTERVAL - 1 frames of changes away.
+"""
+import datetime
+import os
+import re
+import sqlite3
+
+import numpy as np
+
+from . import output, replay
+
+KEY_FRAME_INTERVAL = 25
+INDEX_FILE = 'index.db'
+
+# The dtype of every column file, named <column>.bin in the store directory
+COLUMNS = {
+    # Key frames: whole halite maps, flattened
+    'key_frame_halite': np.int32,
+    # Per frame: where its changed cells and ships start in the cell and ship columns
+    'frame_cell_start': np.int64,
+    'frame_ship_start': np.int64,
+    # Per changed cell
+    'cell_index': np.int32,
+    'cell_halite': np.int32,
+    # Per ship per frame
+    'ship_owner': np.int8,
+    'ship_id': np.int32,
+    'ship_x': np.int16,
+    'ship_y': np.int16,
+    'ship_halite': np.int32,
+    'ship_inspired': np.bool_,
+    # Per frame per player
+    'player_halite': np.int64,
+    'player_deposited': np.int64,
+}
+
+SCHEMA = '''
+create table games (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id TEXT UNIQUE,
+    date TEXT,
+    map_width INTEGER,
+    map_height INTEGER,
+    num_players INTEGER,
+    num_frames INTEGER,
+    map_seed INTEGER,
+    frame_start INTEGER,
+    key_frame_start INTEGER,
+    player_frame_start INTEGER
+);
+create table players (
+    game INTEGER,
+    player_id INTEGER,
+    name TEXT,
+    rank INTEGER,
+    score INTEGER,
+    FOREIGN KEY(game) REFERENCES games(id)
+);
+-- How many rows of each column belong to indexed games; rows past that are from an interrupted conversion
+create table column_lengths (
+    name TEXT PRIMARY KEY,
+    length INTEGER
+);
+create index games_map_size on games(map_width, map_height);
+create index games_date on games(date);
+create index players_name on players(name);
+create index players_game on players(game);
+'''
+
+_DATE_PATTERN = re.compile(r'(\d{8})')
+
+
+def _game_date(path):
+    """
+    :param path: The path of a replay file
+    :return: The game's date as YYYY-MM-DD, from an 8 digit date in its name or else its modification time
+    """
+    match = _DATE_PATTERN.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.datetime.strptime(match.group(1), '%Y%m%d').date().isoformat()
+        except ValueError:
+            pass
+    return datetime.date.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+
+class StoredGame:
+    """
+    One game of a ReplayStore. Every array it returns is a read-only view of the store's memory maps.
+    """
+    def __init__(self, store, row):
+        self._store = store
+        self.id = row['id']
+        self.game_id = row['game_id']
+        self.date = row['date']
+        self.width = row['map_width']
+        self.height = row['map_height']
+        self.num_players = row['num_players']
+        self.num_frames = row['num_frames']
+        self.map_seed = row['map_seed']
+        self._frame_start = row['frame_start']
+        self._key_frame_start = row['key_frame_start']
+        self._player_frame_start = row['player_frame_start']
+
+    def _player_column(self, name):
+        start = self._player_frame_start
+        column = self._store.column(name)[start:start + self.num_frames * self.num_players]
+        return column.reshape(self.num_frames, self.num_players)
+
+    @property
+    def player_halite(self):
+        """
+        :return: A numpy array of stored halite indexed as [frame, player]
+        """
+        return self._player_column('player_halite')
+
+    @property
+    def deposited(self):
+        """
+        :return: A numpy array of deposited halite indexed as [frame, player]
+        """
+        return self._player_column('player_deposited')
+
+    def _rows(self, prefix, frame):
+        """
+        :return: The start and end rows of a frame in the cell or ship columns
+        """
+        starts = self._store.column('frame_{}_start'.format(prefix))
+        index = self._frame_start + frame
+        return starts[index], starts[index + 1]
+
+    def get_ships(self, frame, columns=('owner', 'id', 'x', 'y', 'halite', 'inspired')):
+        """
+        :param frame: The frame number
+        :param columns: Which ship columns to read
+        :return: A dict of column name to a numpy array with a row per ship at the start of the frame
+        """
+        start, end = self._rows('ship', frame)
+        return {column: self._store.column('ship_' + column)[start:end] for column in columns}
+
+    def get_cells(self, frame):
+        """
+        :param frame: The frame number
+        :return: The flat indices and new halite of the cells the frame changed
+        """
+        start, end = self._rows('cell', frame)
+        return self._store.column('cell_index')[start:end], self._store.column('cell_halite')[start:end]
+
+    def get_halite_grid(self, frame):
+        """
+        Rebuilds the halite map at the start of a frame from the nearest key frame.
+        :param frame: The frame number, up to num_frames to get the map after the last frame
+        :return: A new 2-D numpy array indexed as [y, x]
+        """
+        key_frame = min(frame // KEY_FRAME_INTERVAL, max(self.num_frames - 1, 0) // KEY_FRAME_INTERVAL)
+        map_size = self.width * self.height
+        start = self._key_frame_start + key_frame * map_size
+        grid = np.array(self._store.column('key_frame_halite')[start:start + map_size])
+        for changed_frame in range(key_frame * KEY_FRAME_INTERVAL, frame):
+            indices, halite = self.get_cells(changed_frame)
+            grid[indices] = halite
+        return grid.reshape(self.height, self.width)
+
+    def get_players(self):
+        """
+        :return: A list of dicts with each player's id, name, rank and score
+        """
+        return self._store.get_players(self.id)
+
+
+class ReplayStore:
+    """
+    A directory holding the column files and the SQLite index of converted replays.
+    """
+    def __init__(self, path):
+        """
+        Opens a store, creating it if needed.
+        :param path: The store directory
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, INDEX_FILE)
+        exists = os.path.exists(index_path)
+        self.conn = sqlite3.connect(index_path)
+        self.conn.row_factory = sqlite3.Row
+        if not exists:
+            self.conn.executescript(SCHEMA)
+        self._maps = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name + '.bin')
+
+    def _column_length(self, name):
+        path = self._column_path(name)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // np.dtype(COLUMNS[name]).itemsize
+
+    def column(self, name):
+        """
+        Memory-maps a whole column, remapping it if it has grown since.
+        :param name: The column name, a key of COLUMNS
+        :return: A read-only 1-D numpy array
+        """
+        length = self._column_length(name)
+        column = self._maps.get(name)
+        if column is None or len(column) != length:
+            if length == 0:
+                column = np.zeros(0, dtype=COLUMNS[name])
+            else:
+                column = np.memmap(self._column_path(name), dtype=COLUMNS[name], mode='r', shape=(length,))
+            self._maps[name] = column
+        return column
+
+    def _append(self, name, values):
+        """
+        Appends values to a column file.
+        :return: nothing.
+        """
+        with open(self._column_path(name), 'ab') as column_file:
+            column_file.write(np.ascontiguousarray(values, dtype=COLUMNS[name]).tobytes())
+
+    def contains(self, game_id):
+        """
+        :param game_id: A game id, i.e. the replay's file name without extension
+        :return: Whether the game is in the store
+        """
+        return self.conn.execute('select 1 from games where game_id = ?', (game_id,)).fetchone() is not None
+
+    def _discard_uncommitted_rows(self):
+        """
+        Truncates every column file to the rows of the games in the index, dropping what an interrupted
+        conversion appended.
+        :return: A dict of column name to its number of rows
+        """
+        lengths = dict(self.conn.execute('select name, length from column_lengths').fetchall())
+        for name, dtype in COLUMNS.items():
+            lengths.setdefault(name, 0)
+            if self._column_length(name) > lengths[name]:
+                self._maps.pop(name, None)
+                os.truncate(self._column_path(name), lengths[name] * np.dtype(dtype).itemsize)
+        return lengths
+
+    def add(self, path):
+        """
+        Converts a replay and appends it to the store. The column files are appended to first, and the
+        game only becomes part of the store when the index transaction recording it and the new column
+        lengths commits. Rows left by an interrupted conversion are truncated by the next one.
+        :param path: The path of a .hlt or .json replay
+        :return: The game id
+        """
+        game_id = os.path.splitext(os.path.basename(path))[0]
+        game = replay.read_replay(path)
+        lengths = self._discard_uncommitted_rows()
+        # The last frame entry of the previous game is where it ends, which is where this game starts
+        frame_start = max(lengths['frame_cell_start'] - 1, 0)
+        first_game = lengths['frame_cell_start'] == 0
+        cell_start = lengths['cell_index']
+        ship_start = lengths['ship_id']
+        key_frame_start = lengths['key_frame_halite']
+        player_frame_start = lengths['player_halite']
+
+        key_frames = [grid.ravel().copy() for frame, grid in enumerate(game.iter_halite_grids())
+                      if frame % KEY_FRAME_INTERVAL == 0]
+        self._append('key_frame_halite', np.concatenate(key_frames or [game.initial_halite.ravel()]))
+        cell_starts = cell_start + game.cell_offsets
+        ship_starts = ship_start + game.ship_offsets
+        if not first_game:
+            cell_starts, ship_starts = cell_starts[1:], ship_starts[1:]
+        self._append('frame_cell_start', cell_starts)
+        self._append('frame_ship_start', ship_starts)
+        self._append('cell_index', game.cells[:, 1] * game.width + game.cells[:, 0])
+        self._append('cell_halite', game.cells[:, 2])
+        for index, column in enumerate(replay.SHIP_COLUMNS):
+            self._append('ship_' + column, game.ships[:, index])
+        self._append('player_halite', game.player_halite)
+        self._append('player_deposited', game.deposited)
+
+        player_statistics = {statistics['player_id']: statistics
+                             for statistics in game.statistics.get('player_statistics', [])}
+        # Stored halite at the start of the last frame misses the last turn's deposits, so it is only a fallback
+        final_halite = game.player_halite[-1] if game.num_frames else np.zeros(game.num_players, dtype=np.int64)
+        scores = {player_id: int(player_statistics.get(player_id, {}).get('final_production',
+                                                                          final_halite[player_id]))
+                  for player_id in range(game.num_players)}
+        with self.conn:
+            cursor = self.conn.execute(
+                'insert into games (game_id, date, map_width, map_height, num_players, num_frames, map_seed, '
+                'frame_start, key_frame_start, player_frame_start) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (game_id, _game_date(path), game.width, game.height, game.num_players, game.num_frames,
+                 game.map_seed, frame_start, key_frame_start, player_frame_start))
+            self.conn.executemany(
+                'insert into players (game, player_id, name, rank, score) values (?, ?, ?, ?, ?)',
+                [(cursor.lastrowid, player['player_id'], player.get('name'),
+                  player_statistics.get(player['player_id'], {}).get('rank'), scores[player['player_id']])
+                 for player in game.players])
+            self.conn.executemany('insert or replace into column_lengths (name, length) values (?, ?)',
+                                  [(name, self._column_length(name)) for name in COLUMNS])
+        return game_id
+
+    def query(self, game_id=None, player=None, map_width=None, map_height=None, since=None, until=None):
+        """
+        Finds games in the index. Every given condition must hold.
+        :param game_id: A game id
+        :param player: The name of a player in the game
+        :param map_width: The map width
+        :param map_height: The map height
+        :param since: The earliest date, as YYYY-MM-DD
+        :param until: The latest date, as YYYY-MM-DD
+        :return: A list of StoredGame
+        """
+        conditions = []
+        parameters = []
+        for condition, value in (('game_id = ?', game_id), ('map_width = ?', map_width),
+                                 ('map_height = ?', map_height), ('date >= ?', since), ('date <= ?', until),
+                                 ('id in (select game from players where name = ?)', player)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        query = 'select * from games'
+        if conditions:
+            query += ' where ' + ' and '.join(conditions)
+        return [StoredGame(self, row) for row in self.conn.execute(query + ' order by id', parameters)]
+
+    def get_players(self, game):
+        """
+        :param game: The store's id of a game
+        :return: A list of dicts with each player's id, name, rank and score
+        """
+        rows = self.conn.execute('select player_id, name, rank, score from players where game = ? order by player_id',
+                                 (game,))
+        return [dict(row) for row in rows]
+
+
+def convert(store_path, paths):
+    """
+    Converts replay files, or every replay in directories, into a store. Games already in the store are skipped.
+    :param store_path: The store directory
+    :param paths: Replay files or directories of replay files
+    :return: Nothing
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(('.hlt', '.json'))))
+        else:
+            files.append(path)
+
+    converted = 0
+    with ReplayStore(store_path) as store:
+        for number, path in enumerate(files, 1):
+            if store.contains(os.path.splitext(os.path.basename(path))[0]):
+                continue
+            try:
+                game_id = store.add(path)
+            except (ValueError, KeyError) as err:
+                output.warning("Could not convert {}: {}".format(path, err), path=path)
+                continue
+            converted += 1
+            output.output("Converted {} ({}/{}).".format(game_id, number, len(files)),
+                          game_id=game_id, progress=number, total=len(files))
+    output.output("Converted {} replays into {}.".format(converted, store_path), converted=converted)
@@ -18,8 +18,10 @@ setup(name='hlt_client',
       python_requires='>=3',
       install_requires=[
         'appdirs',
+        'numpy',
         'requests',
         'trueskill',
+        'zstandard',
         'zstd',
       ],
       zip_safe=False)
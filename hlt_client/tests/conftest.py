@@ -0,0 +1,38 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_replay(path, seed, final_production=(700, 300)):
+    """
+    Writes a small two-player .json replay whose final scores differ from the stored halite of its last frame.
+    """
+    rng = np.random.RandomState(seed)
+    grid = rng.randint(0, 1000, (8, 8))
+    frames = []
+    for turn in range(30):
+        cells = [{'x': int(x), 'y': int(y), 'production': int(rng.randint(0, 1000))}
+                 for x, y in zip(rng.randint(0, 8, 3), rng.randint(0, 8, 3))]
+        entities = {str(player): {str(player * 100 + ship): {'x': ship, 'y': player, 'energy': turn,
+                                                             'is_inspired': False}
+                                  for ship in range(turn % 3)}
+                    for player in range(2)}
+        frames.append({'cells': cells, 'entities': entities, 'energy': {'0': turn * 10, '1': turn},
+                       'deposited': {'0': turn, '1': 0}})
+    data = {
+        'map_generator_seed': seed,
+        'number_of_players': 2,
+        'players': [{'player_id': 0, 'name': 'a'}, {'player_id': 1, 'name': 'b'}],
+        'production_map': {'width': 8, 'height': 8,
+                           'grid': [[{'energy': int(value)} for value in row] for row in grid]},
+        'game_statistics': {'player_statistics': [
+            {'player_id': player, 'rank': player + 1, 'final_production': final_production[player]}
+            for player in range(2)]},
+        'full_frames': frames,
+    }
+    with open(path, 'w') as replay_file:
+        json.dump(data, replay_file)
@@ -0,0 +1,22 @@
+import math
+
+from hlt_client import compare_bots
+
+
+def test_clean_sweeps_have_unbounded_intervals():
+    for games in range(1, 40):
+        elo, low, high = compare_bots._elo_interval(games, games)
+        assert elo == high == math.inf
+        assert math.isfinite(low)
+        elo, low, high = compare_bots._elo_interval(0, games)
+        assert elo == low == -math.inf
+        assert math.isfinite(high)
+
+
+def test_sprt_bounds():
+    llr, lower, upper = compare_bots._sprt(0, 0, 0, 50, 0.05, 0.05)
+    assert llr == 0
+    assert math.isclose(lower, math.log(0.05 / 0.95))
+    assert math.isclose(upper, math.log(0.95 / 0.05))
+    assert compare_bots._sprt(40, 10, 0, 50, 0.05, 0.05)[0] > upper
+    assert compare_bots._sprt(10, 40, 0, 50, 0.05, 0.05)[0] < lower
@@ -0,0 +1,25 @@
+import zstd
+
+from hlt_client import replay
+
+from conftest import write_replay
+
+
+def test_compressed_replays_are_inflated_as_a_stream(tmp_path):
+    json_path = str(tmp_path / 'replay.json')
+    hlt_path = str(tmp_path / 'replay.hlt')
+    write_replay(json_path, 1)
+    # Compressed the way the engine writes replays
+    with open(json_path, 'rb') as json_file, open(hlt_path, 'wb') as hlt_file:
+        hlt_file.write(zstd.dumps(json_file.read()))
+
+    with replay._open_text(hlt_path) as stream:
+        assert not hasattr(stream.buffer, 'getvalue')
+
+    expected = replay.read_replay(json_path)
+    game = replay.read_replay(hlt_path)
+    for grid, expected_grid in zip(game.iter_halite_grids(), expected.iter_halite_grids()):
+        assert (grid == expected_grid).all()
+    for frame in range(len(expected.player_halite)):
+        assert (game.get_ships(frame) == expected.get_ships(frame)).all()
+    assert (game.player_halite == expected.player_halite).all()
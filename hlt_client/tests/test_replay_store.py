@@ -0,0 +1,41 @@
+import numpy as np
+
+from hlt_client import replay, replay_store
+
+from conftest import write_replay
+
+
+def _check_game(stored, path):
+    game = replay.read_replay(path)
+    for frame, grid in enumerate(game.iter_halite_grids()):
+        assert (stored.get_halite_grid(frame) == grid).all()
+        ships = stored.get_ships(frame)
+        assert (np.stack([ships[column] for column in replay.SHIP_COLUMNS], 1) == game.get_ships(frame)).all()
+    assert (stored.player_halite == game.player_halite).all()
+
+
+def test_scores_come_from_final_production(tmp_path):
+    path = str(tmp_path / 'replay-20181018-1-8-8.json')
+    write_replay(path, 1)
+    with replay_store.ReplayStore(str(tmp_path / 'store')) as store:
+        store.add(path)
+        players = store.query()[0].get_players()
+    assert [(player['rank'], player['score']) for player in players] == [(1, 700), (2, 300)]
+
+
+def test_interrupted_conversion_is_discarded(tmp_path):
+    paths = [str(tmp_path / 'replay-2018101{}-{}-8-8.json'.format(seed, seed)) for seed in range(3)]
+    for seed, path in enumerate(paths):
+        write_replay(path, seed)
+    store_path = str(tmp_path / 'store')
+    with replay_store.ReplayStore(store_path) as store:
+        store.add(paths[0])
+        # A conversion that died after appending some of its columns but before the index commit
+        store._append('frame_cell_start', np.arange(40))
+        store._append('key_frame_halite', np.arange(64))
+        store.add(paths[1])
+        store.add(paths[2])
+        games = store.query()
+        assert [game.game_id for game in games] == [path.rsplit('/', 1)[1][:-5] for path in paths]
+        for game, path in zip(games, paths):
+            _check_game(game, path)
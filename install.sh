@@ -0,0 +1,2 @@
+#!/bin/bash
+python3.6 -m pip install --system --target . numpy
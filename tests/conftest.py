@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine_stream import CONSTANTS  # noqa: E402
+from hlt import constants  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def game_constants():
+    constants.load_constants(CONSTANTS)
@@ -0,0 +1,68 @@
+"""
+Synthetic engine input for the tests and benchmarks: the bytes the Halite III engine sends a bot over a game
+in which ships wander randomly, spawn at their shipyard, sometimes get destroyed and cells change halite.
+"""
+import json
+import random
+
+# The constants the Halite III engine sends by default, MAX_TURNS aside
+CONSTANTS = {
+    'NEW_ENTITY_ENERGY_COST': 1000, 'DROPOFF_COST': 4000, 'MAX_ENERGY': 1000, 'MAX_TURNS': 400,
+    'EXTRACT_RATIO': 4, 'MOVE_COST_RATIO': 10, 'INSPIRATION_ENABLED': True, 'INSPIRATION_RADIUS': 4,
+    'INSPIRATION_SHIP_COUNT': 2, 'INSPIRED_EXTRACT_RATIO': 4, 'INSPIRED_BONUS_MULTIPLIER': 2.0,
+    'INSPIRED_MOVE_COST_RATIO': 10,
+}
+
+MAX_SHIPS = 30
+FIRST_DROPOFF_TURN = 20
+
+
+def generate_lines(size=64, num_turns=400, num_players=4, seed=1):
+    """
+    :param size: The width and height of the map
+    :param num_turns: How many turns the game lasts
+    :param num_players: 2 or 4
+    :param seed: Seeds the game's randomness
+    :return: The lines the engine sends player 0, without line endings
+    """
+    rng = random.Random(seed)
+    corner = size // 8
+    shipyards = [(corner, corner), (size - corner, corner), (corner, size - corner), (size - corner, size - corner)]
+    lines = [json.dumps(dict(CONSTANTS, MAX_TURNS=num_turns)), '{} 0'.format(num_players)]
+    lines.extend('{} {} {}'.format(player, *shipyards[player]) for player in range(num_players))
+    lines.append('{} {}'.format(size, size))
+    lines.extend(' '.join(str(rng.randint(0, 1000)) for _ in range(size)) for _ in range(size))
+
+    next_id = 0
+    ships = [{} for _ in range(num_players)]
+    for turn in range(1, num_turns + 1):
+        lines.append(str(turn))
+        for player in range(num_players):
+            if len(ships[player]) < MAX_SHIPS and rng.random() < 0.5:
+                ships[player][next_id] = list(shipyards[player]) + [0]
+                next_id += 1
+            for ship_id in list(ships[player]):
+                if rng.random() < 0.01:
+                    del ships[player][ship_id]
+                    continue
+                ship = ships[player][ship_id]
+                ship[0] = (ship[0] + rng.choice((-1, 0, 1))) % size
+                ship[1] = (ship[1] + rng.choice((-1, 0, 1))) % size
+                ship[2] = rng.randint(0, 1000)
+            x, y = shipyards[player]
+            dropoffs = [(size * size + player, (x + 3) % size, y)] if turn > FIRST_DROPOFF_TURN else []
+            lines.append('{} {} {} {}'.format(player, len(ships[player]), len(dropoffs), 5000))
+            lines.extend('{} {} {} {}'.format(ship_id, *ship) for ship_id, ship in ships[player].items())
+            lines.extend('{} {} {}'.format(*dropoff) for dropoff in dropoffs)
+        num_cells = rng.randint(10, 80)
+        lines.append(str(num_cells))
+        lines.extend('{} {} {}'.format(rng.randrange(size), rng.randrange(size), rng.randint(0, 1000))
+                     for _ in range(num_cells))
+    return lines
+
+
+def generate(size=64, num_turns=400, num_players=4, seed=1):
+    """
+    :return: The bytes of generate_lines, see there for the parameters
+    """
+    return ('\n'.join(generate_lines(size, num_turns, num_players, seed)) + '\n').encode()
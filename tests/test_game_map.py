@@ -0,0 +1,89 @@
+import heapq
+import random
+
+import numpy as np
+import pytest
+
+from hlt.entity import Shipyard
+from hlt.game_map import GameMap
+from hlt.positionals import Direction, Position
+
+
+def _brute_force_path_cost(game_map, source, target):
+    """
+    Forward Dijkstra over (halite spent, moves) tuples, independent of the path tree's integer keys.
+    """
+    best = {source: (0, 0)}
+    frontier = [(0, 0, source.x, source.y)]
+    while frontier:
+        cost, steps, x, y = heapq.heappop(frontier)
+        position = Position(x, y)
+        if best[position] != (cost, steps):
+            continue
+        if position == target:
+            return cost, steps
+        move_cost = game_map[position].halite_amount // 10
+        for direction in Direction.get_all_cardinals():
+            neighbour = game_map.normalize(position.directional_offset(direction))
+            key = (cost + move_cost, steps + 1)
+            if neighbour not in best or key < best[neighbour]:
+                best[neighbour] = key
+                heapq.heappush(frontier, key + (neighbour.x, neighbour.y))
+
+
+def _walk(game_map, structure, position):
+    """
+    Follows get_cheapest_direction to the structure, returning the halite spent and the moves made.
+    """
+    cost = steps = 0
+    while position != structure.position:
+        direction = game_map.get_cheapest_direction(structure, position)
+        assert direction != Direction.Still
+        cost += game_map[position].halite_amount // 10
+        position = game_map.normalize(position.directional_offset(direction))
+        steps += 1
+    return cost, steps
+
+
+def test_cheapest_paths_on_rich_map():
+    # Far cells of a rich map cost more halite than there are cells to reach
+    game_map = GameMap(np.full((32, 32), 600, dtype=np.int32))
+    shipyard = Shipyard(0, -1, Position(8, 8))
+    far = Position(24, 24)
+    assert game_map.get_cheapest_path_cost(shipyard, far) == (1920, 32)
+    assert game_map.get_cheapest_direction(shipyard, far) != Direction.Still
+    assert _walk(game_map, shipyard, far) == (1920, 32)
+
+
+def test_cheapest_paths_match_brute_force():
+    random.seed(0)
+    game_map = GameMap(np.random.RandomState(0).randint(0, 1000, (24, 24)).astype(np.int32))
+    shipyard = Shipyard(0, -1, Position(5, 17))
+    for _ in range(40):
+        position = Position(random.randrange(24), random.randrange(24))
+        expected = _brute_force_path_cost(game_map, position, shipyard.position)
+        assert game_map.get_cheapest_path_cost(shipyard, position) == expected
+        assert _walk(game_map, shipyard, position) == expected
+
+
+def test_richest_cells_match_brute_force():
+    rng = random.Random(0)
+    # Few distinct amounts, so that ties are common
+    game_map = GameMap(np.array([[rng.randint(0, 20) * 50 for _ in range(16)] for _ in range(16)], dtype=np.int32))
+    halite = game_map.halite_grid.ravel()
+    for _ in range(200):
+        position = Position(rng.randrange(16), rng.randrange(16))
+        radius = rng.randint(0, 17)
+        # Counts beyond the size of the region make the index give up and scan the region
+        count = rng.choice([1, 5, 20, 300])
+        cells = [index for index in range(256)
+                 if game_map.calculate_distance(position, game_map.index_to_position(index)) <= radius]
+        expected = sorted(cells, key=lambda index: (-halite[index], index))[:count]
+        assert game_map.get_richest_cells(count, position, radius) == \
+            [game_map.index_to_position(index) for index in expected]
+
+
+def test_richest_cells_around_a_position_need_a_radius():
+    game_map = GameMap(np.zeros((8, 8), dtype=np.int32))
+    with pytest.raises(ValueError):
+        game_map.get_richest_cells(3, Position(1, 1))
@@ -0,0 +1,128 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from hlt import constants
+from hlt.entity import Ship
+from hlt.game_map import GameMap, _UNASSIGNABLE, _solve_assignment
+from hlt.positionals import Direction, Position
+
+
+def _make_map(rng, size=8, ships=(), enemies=()):
+    game_map = GameMap(np.array([[rng.randint(0, 1000) for _ in range(size)] for _ in range(size)], dtype=np.int32))
+    for ship in list(ships) + list(enemies):
+        game_map[ship.position].mark_unsafe(ship)
+    return game_map
+
+
+def _random_fleet(rng, num_ships, num_enemies, size=8):
+    cells = rng.sample([Position(x, y) for x in range(4) for y in range(4)], num_ships + num_enemies)
+    ships = [Ship(0, ship_id, position, rng.randint(0, 200)) for ship_id, position in enumerate(cells[:num_ships])]
+    enemies = [Ship(1, 100 + ship_id, position, 0) for ship_id, position in enumerate(cells[num_ships:])]
+    game_map = _make_map(rng, size, ships, enemies)
+    destinations = {ship: Position(rng.randrange(size), rng.randrange(size)) for ship in ships}
+    return game_map, ships, enemies, destinations
+
+
+def _move_options(game_map, ship, enemies):
+    """
+    :return: The directions a ship can afford that do not move it onto an enemy ship
+    """
+    if ship.halite_amount < game_map[ship.position].halite_amount // constants.MOVE_COST_RATIO:
+        return [Direction.Still]
+    enemy_cells = {enemy.position for enemy in enemies}
+    return [Direction.Still] + [direction for direction in Direction.get_all_cardinals()
+                                if game_map.directional_offset(ship.position, direction) not in enemy_cells]
+
+
+def _cost(game_map, ship, destination, direction, priority):
+    target = game_map.directional_offset(ship.position, direction)
+    return priority * (game_map.calculate_distance(target, destination)
+                       - game_map.calculate_distance(ship.position, destination) + 1)
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_assignment_matches_brute_force(seed):
+    rng = random.Random(seed)
+    num_rows = rng.randint(1, 5)
+    num_columns = rng.randint(num_rows, 6)
+    costs = np.array([[rng.choice([rng.randint(0, 9), _UNASSIGNABLE]) for _ in range(num_columns)]
+                      for _ in range(num_rows)], dtype=float)
+    assignment = _solve_assignment(costs)
+    assert len(set(assignment)) == num_rows
+    best = min(sum(costs[row, columns[row]] for row in range(num_rows))
+               for columns in itertools.permutations(range(num_columns), num_rows))
+    assert sum(costs[row, column] for row, column in enumerate(assignment)) == pytest.approx(best)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_fleet_moves_are_optimal_and_safe(seed):
+    rng = random.Random(seed)
+    game_map, ships, enemies, destinations = _random_fleet(rng, rng.randint(2, 5), rng.randint(0, 4))
+    priorities = {ship.id: rng.randint(1, 3) for ship in ships}
+    options = [_move_options(game_map, ship, enemies) for ship in ships]
+
+    moves = game_map.navigate_fleet(destinations, priorities)
+
+    targets = [game_map.directional_offset(ship.position, moves[ship.id]) for ship in ships]
+    assert len(set(targets)) == len(ships)
+    for ship, ship_options, target in zip(ships, options, targets):
+        assert moves[ship.id] in ship_options
+        assert game_map[target].ship is ship
+
+    def total_cost(directions):
+        return sum(_cost(game_map, ship, destinations[ship], direction, priorities[ship.id])
+                   for ship, direction in zip(ships, directions))
+
+    best = min(total_cost(directions) for directions in itertools.product(*options)
+               if len({game_map.directional_offset(ship.position, direction)
+                       for ship, direction in zip(ships, directions)}) == len(ships))
+    assert total_cost([moves[ship.id] for ship in ships]) == best
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_fleet_makes_at_least_the_progress_of_sequential_navigation(seed):
+    # With equal priorities and every move affordable, the moves naive_navigate picks one ship at a time are
+    # among those navigate_fleet chooses from, and its cost is minimal when progress is maximal
+    rng = random.Random(seed)
+    game_map, ships, enemies, destinations = _random_fleet(rng, 12, 2)
+    for ship in ships:
+        ship.halite_amount = constants.MAX_HALITE
+    sequential_map = _make_map(random.Random(seed), ships=ships, enemies=enemies)
+    sequential = {ship.id: sequential_map.naive_navigate(ship, destinations[ship]) for ship in ships}
+    moves = game_map.navigate_fleet(destinations, {ship.id: 1 for ship in ships})
+
+    def progress(map_, directions):
+        return sum(map_.calculate_distance(ship.position, destinations[ship])
+                   - map_.calculate_distance(map_.directional_offset(ship.position, directions[ship.id]),
+                                             destinations[ship]) for ship in ships)
+
+    assert progress(game_map, moves) >= progress(sequential_map, sequential)
+
+
+def test_ships_swap_places():
+    first = Ship(0, 0, Position(3, 3), 100)
+    second = Ship(0, 1, Position(4, 3), 100)
+    game_map = _make_map(random.Random(0), ships=[first, second])
+    moves = game_map.navigate_fleet({first: Position(4, 3), second: Position(3, 3)})
+    assert moves == {0: Direction.East, 1: Direction.West}
+
+
+def test_ships_stack_on_stacking_positions():
+    shipyard = Position(3, 3)
+    ships = [Ship(0, ship_id, position, 100) for ship_id, position in
+             enumerate([Position(2, 3), Position(4, 3), Position(3, 2), Position(3, 4)])]
+    game_map = _make_map(random.Random(0), ships=ships)
+    moves = game_map.navigate_fleet({ship: shipyard for ship in ships}, stacking_positions=[shipyard])
+    assert all(game_map.directional_offset(ship.position, moves[ship.id]) == shipyard for ship in ships)
+
+
+def test_ships_left_out_keep_their_cells():
+    harvester = Ship(0, 0, Position(4, 3), 0)
+    returning = Ship(0, 1, Position(3, 3), constants.MAX_HALITE)
+    game_map = _make_map(random.Random(0), ships=[harvester, returning])
+    moves = game_map.navigate_fleet({returning: Position(5, 3)})
+    assert game_map.directional_offset(returning.position, moves[returning.id]) != harvester.position
+    assert game_map[harvester.position].ship is harvester
@@ -0,0 +1,117 @@
+import json
+import random
+import sys
+import time
+import types
+
+import numpy as np
+import pytest
+
+from engine_stream import generate_lines
+from hlt import networking
+from hlt.networking import FrameReader, Game
+
+
+class _TrickleStream:
+    """
+    A binary stream whose reads return a few bytes at a time, so tokens and lines get split across reads.
+    """
+    def __init__(self, data, seed):
+        self._data = data
+        self._offset = 0
+        self._random = random.Random(seed)
+
+    def read1(self, size):
+        end = self._offset + min(size, self._random.randint(1, 16))
+        chunk = self._data[self._offset:end]
+        self._offset = end
+        return chunk
+
+
+def _parse_lines(lines):
+    """
+    Parses the engine input one line at a time, the way the starter kit did before FrameReader.
+    :return: The halite grid before the first turn, then for every turn its number, a dict of player id to its
+             halite, ships and dropoffs, and the halite grid after the turn
+    """
+    lines = iter(lines)
+    json.loads(next(lines))
+    num_players, _ = map(int, next(lines).split())
+    for _ in range(num_players):
+        next(lines)
+    width, height = map(int, next(lines).split())
+    grid = np.array([[int(halite) for halite in next(lines).split()] for _ in range(height)])
+    yield grid.copy()
+    for turn in lines:
+        players = {}
+        for _ in range(num_players):
+            player, num_ships, num_dropoffs, halite = map(int, next(lines).split())
+            ships = {}
+            for _ in range(num_ships):
+                ship_id, x, y, ship_halite = map(int, next(lines).split())
+                ships[ship_id] = (x, y, ship_halite)
+            dropoffs = {}
+            for _ in range(num_dropoffs):
+                dropoff_id, x, y = map(int, next(lines).split())
+                dropoffs[dropoff_id] = (x, y)
+            players[player] = (halite, ships, dropoffs)
+        for _ in range(int(next(lines))):
+            x, y, halite = map(int, next(lines).split())
+            grid[y, x] = halite
+        yield int(turn), players, grid.copy()
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_frame_reader_matches_line_parser(monkeypatch, tmp_path, seed):
+    lines = generate_lines(size=16, num_turns=30, num_players=4, seed=seed)
+    data = ('\n'.join(lines) + '\n').encode()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'stdin', types.SimpleNamespace(buffer=_TrickleStream(data, seed)))
+    expected = _parse_lines(lines)
+
+    game = Game()
+    np.testing.assert_array_equal(game.game_map.halite_grid, next(expected))
+    for turn, players, grid in expected:
+        game.update_frame()
+        assert game.turn_number == turn
+        for player_id, (halite, ships, dropoffs) in players.items():
+            player = game.players[player_id]
+            assert player.halite_amount == halite
+            assert {ship.id: (ship.position.x, ship.position.y, ship.halite_amount)
+                    for ship in player.get_ships()} == ships
+            assert {dropoff.id: (dropoff.position.x, dropoff.position.y)
+                    for dropoff in player.get_dropoffs()} == dropoffs
+            assert all(game.game_map[ship.position].is_occupied for ship in player.get_ships())
+        np.testing.assert_array_equal(game.game_map.halite_grid, grid)
+
+    with pytest.raises(SystemExit):
+        game.update_frame()
+
+
+def test_frame_reader_reads_tokens_split_across_reads():
+    reader = FrameReader(_TrickleStream(b'{"a": 1}\n12345 -6 789\n0\n', seed=0))
+    assert reader.read_line() == '{"a": 1}'
+    assert reader.read_ints(2) == [12345, -6]
+    assert reader.read_int() == 789
+    assert reader.read_int() == 0
+
+
+def test_fallback_after_an_overrun_stays_within_the_limit(monkeypatch, tmp_path):
+    data = ('\n'.join(generate_lines(size=8, num_turns=2, num_players=2)) + '\n').encode()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'stdin', types.SimpleNamespace(buffer=_TrickleStream(data, 0)))
+    sent = []
+    monkeypatch.setattr(networking, 'send_commands', lambda commands: sent.append((time.perf_counter(), commands)))
+    game = Game(turn_time_limit=0.3, safety_margin=0.1)
+
+    # Both turns overrun the fallback by more than the safety margin
+    for _ in range(2):
+        game.update_frame()
+        game.set_fallback_commands(['fallback'])
+        time.sleep(0.35)
+        game.end_turn(['late'])
+
+    (first_sent, first), (second_sent, second) = sent
+    assert first == second == ['fallback']
+    # The engine started the second turn when it got the first fallback
+    assert second_sent - first_sent < game.turn_time_limit
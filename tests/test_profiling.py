@@ -0,0 +1,42 @@
+import io
+import sys
+import time
+
+from engine_stream import generate
+from hlt.networking import Game
+from hlt.profiling import FALLBACK_SPAN, SEND_SPAN, USER_SPAN, Profiler
+
+
+def test_nested_spans_can_be_reentered():
+    profiler = Profiler()
+    outer = profiler.span('outer')
+    inner = profiler.span('inner')
+    for _ in range(2):
+        with outer:
+            with inner:
+                pass
+    assert sorted(profiler.summary()) == ['outer', 'outer/inner']
+    assert profiler.summary()['outer/inner']['count'] == 2
+
+
+def test_timed_out_turns_record_user_time(monkeypatch, tmp_path, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BufferedReader(io.BytesIO(generate(size=8, num_turns=2, num_players=2)))))
+    game = Game(turn_time_limit=0.2, safety_margin=0.15, profile=True)
+    game.profiler.path = str(tmp_path / 'profile.json')
+    game.ready('test')
+
+    # The fallback is sent after 0.05 seconds, before end_turn
+    game.update_frame()
+    game.set_fallback_commands([])
+    time.sleep(0.15)
+    game.end_turn([])
+
+    game.update_frame()
+    game.end_turn([])
+
+    summary = game.profiler.summary()
+    assert summary[USER_SPAN]['count'] == 2
+    assert summary[USER_SPAN]['max'] >= 0.15
+    assert summary[FALLBACK_SPAN]['count'] == 1
+    assert summary[SEND_SPAN]['count'] == 1